@@ -1,8 +1,146 @@
 import chess
+import chess.polyglot
+import time
 from evaluate import evaluate_board
+from bitbase import probe_bitbase
 
-def quiescence_search(board, alpha, beta, is_maximizing, eval_func):
-    stand_pat = eval_func(board)
+# Transposition table entry flags: is the stored score exact, or only a bound?
+EXACT = 0
+LOWER_BOUND = 1 # The real score is at least this (the search failed high)
+UPPER_BOUND = 2 # The real score is at most this (the search failed low)
+
+# Each table is simply emptied when it gets this big, so a long game can't eat all the RAM.
+# A Python dict entry (key tuple + value + slot) costs a few hundred bytes, so we budget
+# TABLE_ENTRY_BYTES per entry and split the UCI 'Hash' megabytes over the TT and the eval cache.
+TABLE_ENTRY_BYTES = 500
+DEFAULT_HASH_MB = 128
+
+def entries_for_hash(hash_mb):
+    """
+    How many entries each of the two tables may hold to stay within hash_mb megabytes.
+    """
+    return max(1000, hash_mb * 1024 * 1024 // (2 * TABLE_ENTRY_BYTES))
+
+MAX_TABLE_ENTRIES = entries_for_hash(DEFAULT_HASH_MB) # ~134k entries each
+
+# Any score at least this big means somebody is getting checkmated
+MATE_SCORE = 99999
+
+# With a clock or a node limit but no depth, iterative deepening goes up to this depth
+# (in practice the time or the nodes always run out first)
+MAX_DEPTH = 64
+
+# Looking at the clock costs time too, so we only do it once every this many nodes
+TIME_CHECK_INTERVAL = 64
+
+class SearchAborted(Exception):
+    """
+    Raised inside the search when the time or node limit runs out.
+    """
+
+def _transposition_key(board):
+    return board._transposition_key()
+
+def _fast_key_works():
+    """
+    board._transposition_key() is private to python-chess, so a new version could rename or change it.
+    Check once that it still exists and gives transpositions the same key (and other positions a different one).
+    """
+    try:
+        a = chess.Board()
+        for move in ["g1f3", "g8f6", "f3g1", "f6g8"]:
+            a.push_uci(move)
+        b = chess.Board()
+        c = chess.Board()
+        c.push_uci("e2e4")
+        return hash(_transposition_key(a)) == hash(_transposition_key(b)) and \
+            _transposition_key(a) == _transposition_key(b) and _transposition_key(a) != _transposition_key(c)
+    except Exception:
+        return False
+
+# python-chess computes its own key in ~1us, while chess.polyglot.zobrist_hash takes ~35us.
+# The zobrist hash is the slow but public fallback.
+_key_function = _transposition_key if _fast_key_works() else chess.polyglot.zobrist_hash
+
+def position_key(board):
+    """
+    A hashable key for the position (pieces, side to move, castling rights, en passant square).
+    Positions reached by different move orders get the same key.
+    """
+    return _key_function(board)
+
+class SearchState:
+    """
+    Everything the search has learned that is still useful for the next move:
+    - transposition_table: position -> (depth, score, flag, best move) of positions we already searched
+    - history: (from_square, to_square) -> how often this quiet move caused a cutoff
+    - eval_cache: position -> static evaluation, so we never evaluate the same board twice
+    Keep one SearchState for a whole game and clear() it when a new game starts.
+    
+    It also counts the nodes of the current search and knows when it has to stop
+    (iterative_deepening() sets stop_time and node_limit).
+    """
+    def __init__(self, max_entries=MAX_TABLE_ENTRIES):
+        self.max_entries = max_entries # Per table, see entries_for_hash()
+        self.transposition_table = {}
+        self.history = {}
+        self.eval_cache = {}
+        self.nodes = 0
+        self.stop_time = None
+        self.node_limit = None
+        
+    def clear(self):
+        self.transposition_table.clear()
+        self.history.clear()
+        self.eval_cache.clear()
+        
+    def count_node(self):
+        self.nodes += 1
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchAborted()
+        if self.stop_time is not None and self.nodes % TIME_CHECK_INTERVAL == 0 and time.perf_counter() >= self.stop_time:
+            raise SearchAborted()
+        
+    def evaluate(self, board, eval_func):
+        key = position_key(board)
+        score = self.eval_cache.get(key)
+        if score is None:
+            if len(self.eval_cache) >= self.max_entries:
+                self.eval_cache.clear()
+            score = eval_func(board)
+            self.eval_cache[key] = score
+        return score
+        
+    def store(self, key, depth, score, flag, best_move):
+        if len(self.transposition_table) >= self.max_entries:
+            self.transposition_table.clear()
+        self.transposition_table[key] = (depth, score, flag, best_move)
+        
+    def reward(self, board, move, depth):
+        # Deeper cutoffs are worth more: they saved us a bigger subtree
+        if not board.is_capture(move):
+            key = (move.from_square, move.to_square)
+            self.history[key] = self.history.get(key, 0) + depth * depth
+
+def ordered_moves(board, state, tt_move=None):
+    """
+    Puts the most promising moves first, so alpha-beta can prune as early as possible:
+    the best move from the transposition table, then captures, then quiet moves by history score.
+    """
+    def priority(move):
+        if move == tt_move:
+            return (0, 0)
+        if board.is_capture(move):
+            return (1, 0)
+        return (2, -state.history.get((move.from_square, move.to_square), 0))
+    return sorted(board.legal_moves, key=priority)
+
+def quiescence_search(board, alpha, beta, is_maximizing, eval_func, state=None):
+    if state is not None:
+        state.count_node()
+        stand_pat = state.evaluate(board, eval_func)
+    else:
+        stand_pat = eval_func(board)
 
     if is_maximizing:
         if stand_pat >= beta:
@@ -12,7 +150,7 @@ def quiescence_search(board, alpha, beta, is_maximizing, eval_func):
         capture_moves = [m for m in board.legal_moves if board.is_capture(m)]
         for move in capture_moves:
             board.push(move)
-            score = quiescence_search(board, alpha, beta, False, eval_func)
+            score = quiescence_search(board, alpha, beta, False, eval_func, state)
             board.pop()
             
             if score >= beta:
@@ -27,7 +165,7 @@ def quiescence_search(board, alpha, beta, is_maximizing, eval_func):
         capture_moves = [m for m in board.legal_moves if board.is_capture(m)]
         for move in capture_moves:
             board.push(move)
-            score = quiescence_search(board, alpha, beta, True, eval_func)
+            score = quiescence_search(board, alpha, beta, True, eval_func, state)
             board.pop()
             
             if score <= alpha:
@@ -36,24 +174,58 @@ def quiescence_search(board, alpha, beta, is_maximizing, eval_func):
         return beta
 
 
-def minimax_alpha_beta(board, depth, alpha, beta, is_maximizing, eval_func=evaluate_board):
+def minimax_alpha_beta(board, depth, alpha, beta, is_maximizing, eval_func=evaluate_board, state=None):
     """
     Minimax with Alpha-Beta Pruning.
     alpha: The best score White can guarantee (initially -infinity)
     beta: The best score Black can guarantee (initially +infinity)
+    state: an optional SearchState. With it, we remember positions we have already
+           searched (transposition table) and try the most promising moves first.
     """
     
     if depth == 0 or board.is_game_over():
-        return quiescence_search(board, alpha, beta, is_maximizing, eval_func)
+        return quiescence_search(board, alpha, beta, is_maximizing, eval_func, state)
+
+    if state is not None:
+        state.count_node()
+
+    # In KQK/KRK/KPK the endgame bitbase already knows the exact result: no need to search any deeper
+    bitbase_score = probe_bitbase(board)
+    if bitbase_score is not None:
+        return bitbase_score
+
+    # Did we already search this exact position at least this deep? Then reuse the answer!
+    tt_move = None
+    if state is not None:
+        key = position_key(board)
+        entry = state.transposition_table.get(key)
+        if entry is not None:
+            entry_depth, entry_score, entry_flag, tt_move = entry
+            if entry_depth >= depth:
+                if entry_flag == EXACT:
+                    return entry_score
+                if entry_flag == LOWER_BOUND:
+                    alpha = max(alpha, entry_score)
+                else:
+                    beta = min(beta, entry_score)
+                if beta <= alpha:
+                    return entry_score
+        original_alpha, original_beta = alpha, beta
+        moves = ordered_moves(board, state, tt_move)
+    else:
+        moves = board.legal_moves
+    best_move = None
 
     if is_maximizing:
         best_eval = -float('inf')
-        for move in board.legal_moves:
+        for move in moves:
             board.push(move)
-            eval_score = minimax_alpha_beta(board, depth - 1, alpha, beta, False, eval_func)
+            eval_score = minimax_alpha_beta(board, depth - 1, alpha, beta, False, eval_func, state)
             board.pop()
             
-            best_eval = max(best_eval, eval_score)
+            if eval_score > best_eval:
+                best_eval = eval_score
+                best_move = move
             alpha = max(alpha, eval_score) # White updates its guaranteed minimum score
             
             # THE PRUNING STEP:
@@ -61,19 +233,21 @@ def minimax_alpha_beta(board, depth, alpha, beta, is_maximizing, eval_func=evalu
             # Black will NEVER let White play this line.
             # So, we stop looking at any more moves in this branch!
             if beta <= alpha:
+                if state is not None:
+                    state.reward(board, move, depth)
                 break # "Prune" the tree ✂️
-                
-        return best_eval
 
     else:
         # Black's Turn
         best_eval = float('inf')
-        for move in board.legal_moves:
+        for move in moves:
             board.push(move)
-            eval_score = minimax_alpha_beta(board, depth - 1, alpha, beta, True, eval_func)
+            eval_score = minimax_alpha_beta(board, depth - 1, alpha, beta, True, eval_func, state)
             board.pop()
             
-            best_eval = min(best_eval, eval_score)
+            if eval_score < best_eval:
+                best_eval = eval_score
+                best_move = move
             beta = min(beta, eval_score) # Black updates its guaranteed maximum score
             
             # THE PRUNING STEP:
@@ -81,40 +255,135 @@ def minimax_alpha_beta(board, depth, alpha, beta, is_maximizing, eval_func=evalu
             # White will NEVER let Black play this line.
             # So, we stop looking!
             if beta <= alpha:
+                if state is not None:
+                    state.reward(board, move, depth)
                 break # "Prune" the tree ✂️
+
+    if state is not None:
+        # If the search was cut short by alpha/beta, the score is only a bound, not the exact value
+        if best_eval <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_eval >= original_beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        state.store(key, depth, best_eval, flag, best_move)
                 
-        return best_eval
+    return best_eval
 
-def get_best_move_alpha_beta(board, depth):
-    alpha = -float('inf')
-    beta = float('inf')
-    best_move = None
+def search_multipv(board, depth, eval_func=evaluate_board, state=None, multipv=1):
+    """
+    Searches every legal move at the root and returns the `multipv` best ones,
+    as a list of (move, score) sorted from best to worst for the side to move.
+    The scores are always from White's point of view (positive = White is winning).
+    """
+    white_to_move = board.turn == chess.WHITE
+    lines = [] # The best `multipv` lines found so far, best first
     
-    if board.turn == chess.WHITE:
-        best_eval = -float('inf')
-        for move in board.legal_moves:
-            board.push(move)
-            eval_score = minimax_alpha_beta(board, depth - 1, alpha, beta, False)
-            board.pop()
-            
-            if eval_score > best_eval:
-                best_eval = eval_score
-                best_move = move
-            # Alpha is updated at the root as well
-            alpha = max(alpha, eval_score) 
+    if state is not None:
+        entry = state.transposition_table.get(position_key(board))
+        moves = ordered_moves(board, state, entry[3] if entry is not None else None)
     else:
-        best_eval = float('inf')
-        for move in board.legal_moves:
-            board.push(move)
-            eval_score = minimax_alpha_beta(board, depth - 1, alpha, beta, True)
-            board.pop()
+        moves = board.legal_moves
+    
+    for move in moves:
+        # A move only matters if it beats the worst line we are still keeping,
+        # so that line's score is our alpha (White) or beta (Black) at the root.
+        alpha = -float('inf')
+        beta = float('inf')
+        if len(lines) == multipv:
+            if white_to_move:
+                alpha = lines[-1][1]
+            else:
+                beta = lines[-1][1]
+        
+        board.push(move)
+        if board.is_repetition(2):
+            # Going back to a position we've already had is a step towards a draw by repetition.
+            # (Without this, a winning engine happily shuffles back and forth between equal positions.)
+            eval_score = 0
+        else:
+            eval_score = minimax_alpha_beta(board, depth - 1, alpha, beta, not white_to_move, eval_func, state)
+        board.pop()
+        
+        if len(lines) < multipv or (eval_score > lines[-1][1] if white_to_move else eval_score < lines[-1][1]):
+            lines.append((move, eval_score))
+            # sorted() is stable: between equal scores, the move we searched first stays first
+            lines = sorted(lines, key=lambda line: line[1], reverse=white_to_move)[:multipv]
+    
+    if state is not None and lines:
+        state.store(position_key(board), depth, lines[0][1], EXACT, lines[0][0])
+    
+    return lines
+
+def search_root(board, depth, eval_func=evaluate_board, state=None):
+    """
+    Searches every legal move at the root and returns BOTH the best move and its score.
+    The score is always from White's point of view (positive = White is winning).
+    Pass the same SearchState on every move of a game to reuse what earlier searches learned.
+    """
+    lines = search_multipv(board, depth, eval_func, state, multipv=1)
+    if not lines:
+        return None, (-float('inf') if board.turn == chess.WHITE else float('inf'))
+    return lines[0]
+
+def iterative_deepening(board, max_depth, eval_func=evaluate_board, state=None,
+                        time_limit=None, node_limit=None, multipv=1, on_depth=None):
+    """
+    Searches depth 1, then 2, then 3... until max_depth is done or the time/node limit runs out.
+    Every finished depth fills the transposition table, which makes the next depth faster,
+    so this costs barely more than searching max_depth directly.
+    
+    time_limit is in seconds. Depth 1 is always finished, so we always have a move to play.
+    on_depth(depth, lines, nodes, seconds) is called after every finished depth.
+    Returns (lines, depth) of the deepest finished depth, lines = [(move, score), ...] best first.
+    """
+    if state is None:
+        state = SearchState()
+    start = time.perf_counter()
+    start_ply = len(board.move_stack)
+    state.nodes = 0
+    state.stop_time = None
+    state.node_limit = None
+    
+    lines, completed_depth = [], 0
+    # In a bitbase position every move below the root is looked up, not searched,
+    # so depth 2, 3, 4... would only repeat the depth 1 search
+    root_in_bitbase = probe_bitbase(board) is not None
+    try:
+        for depth in range(1, max_depth + 1):
+            try:
+                lines = search_multipv(board, depth, eval_func, state, multipv)
+            except SearchAborted:
+                # We were stopped halfway through a move: take back everything the search pushed
+                while len(board.move_stack) > start_ply:
+                    board.pop()
+                break
+            completed_depth = depth
+            elapsed = time.perf_counter() - start
+            if on_depth is not None:
+                on_depth(depth, lines, state.nodes, elapsed)
             
-            if eval_score < best_eval:
-                best_eval = eval_score
-                best_move = move
-            # Beta is updated at the root as well
-            beta = min(beta, eval_score)
-                
+            # No legal moves, a forced mate found or a bitbase position: searching deeper won't change anything
+            if not lines or abs(lines[0][1]) >= MATE_SCORE or root_in_bitbase:
+                break
+            # Now that we have a move to fall back on, the limits are allowed to stop the search
+            if time_limit is not None:
+                state.stop_time = start + time_limit
+                if elapsed >= time_limit:
+                    break
+            if node_limit is not None:
+                state.node_limit = node_limit
+                if state.nodes >= node_limit:
+                    break
+    finally:
+        state.stop_time = None
+        state.node_limit = None
+    
+    return lines, completed_depth
+
+def get_best_move_alpha_beta(board, depth):
+    best_move, _ = search_root(board, depth)
     return best_move
 
 def main():
@@ -0,0 +1,262 @@
+import argparse
+import asyncio
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import chess
+import numpy as np
+import torch
+from alphabeta import SearchState, iterative_deepening, position_key, MAX_TABLE_ENTRIES, MAX_DEPTH
+from data_processing import board_to_tensor
+from bitbase import probe_bitbase
+from integration import load_ai_brain, game_over_score
+
+class BatchingEvaluator:
+    """
+    ONE inference worker shared by every search running on the server.
+
+    A single position through ChessNet costs almost the same as 64 positions in one batch,
+    so instead of every search calling the network on its own, searches drop their leaf
+    positions into a queue. The worker thread takes everything that is waiting, runs it
+    through the network as one batch, and hands each search its score back.
+
+    All evaluations also go into one shared cache: when two requests analyse similar
+    positions, the second one gets the overlapping evaluations for free.
+
+    An instance can be used as an eval_func: evaluator(board) -> centipawns (White's view).
+    """
+    def __init__(self, model, max_batch_size=256, max_wait=0.0005):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait # Seconds we wait for more searches to join a batch
+        self.requests = queue.Queue()
+        self.cache = {}
+        self.lock = threading.Lock()
+        self.active_searches = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.batches = 0
+        self.batched_positions = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def __call__(self, board):
+        score = game_over_score(board)
+        if score is None:
+            score = probe_bitbase(board)
+        if score is not None:
+            return score
+
+        key = position_key(board)
+        score = self.cache.get(key)
+        if score is not None:
+            self.cache_hits += 1
+            return score
+
+        # Not cached: queue it up for the inference worker and wait for the answer
+        self.cache_misses += 1
+        future = Future()
+        self.requests.put((board_to_tensor(board), future))
+        score = future.result()
+
+        with self.lock:
+            if len(self.cache) >= MAX_TABLE_ENTRIES:
+                self.cache.clear()
+            self.cache[key] = score
+        return score
+
+    def search_started(self):
+        with self.lock:
+            self.active_searches += 1
+
+    def search_finished(self):
+        with self.lock:
+            self.active_searches -= 1
+
+    def stats(self):
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "active_searches": self.active_searches,
+            "batches": self.batches,
+            "avg_batch_size": self.batched_positions / self.batches if self.batches else 0.0,
+            "cache_entries": len(self.cache),
+            "cache_hit_rate": self.cache_hits / lookups if lookups else 0.0,
+        }
+
+    def _run(self):
+        while True:
+            # 1. Sleep until at least one search needs an evaluation
+            batch = [self.requests.get()]
+
+            # 2. Scoop up everything else that is waiting. While other searches are still
+            #    running, give them a tiny moment to join: a bigger batch is nearly free.
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self.requests.get_nowait())
+                    continue
+                except queue.Empty:
+                    pass
+                remaining = deadline - time.perf_counter()
+                if len(batch) >= self.active_searches or remaining <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # 3. One forward pass for the whole batch: (N, 8, 8, 12) -> (N, 12, 8, 8)
+            tensors = torch.from_numpy(np.stack([tensor for tensor, _ in batch])).permute(0, 3, 1, 2)
+            try:
+                with torch.no_grad():
+                    scores = (self.model(tensors).squeeze(1) * 1000).tolist()
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.batched_positions += len(batch)
+            for (_, future), score in zip(batch, scores):
+                future.set_result(score)
+
+def analyse(evaluator, fen, depth=None, movetime=None, nodes=None, multipv=1):
+    """
+    Runs one analysis (in a worker thread) and returns the JSON-ready answer.
+    movetime is in milliseconds, like the UCI 'go movetime' command.
+    """
+    board = chess.Board(fen)
+    if depth is None:
+        depth = MAX_DEPTH if (movetime or nodes) else 3
+
+    state = SearchState()
+    start = time.perf_counter()
+    evaluator.search_started()
+    try:
+        lines, completed_depth = iterative_deepening(
+            board, depth, eval_func=evaluator, state=state,
+            time_limit=movetime / 1000 if movetime else None, node_limit=nodes, multipv=multipv)
+    finally:
+        evaluator.search_finished()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "fen": board.fen(),
+        "depth": completed_depth,
+        "nodes": state.nodes,
+        "time_ms": round(elapsed * 1000, 1),
+        "nps": round(state.nodes / elapsed) if elapsed > 0 else 0,
+        # Scores are centipawns from White's point of view, best line first
+        "lines": [{"move": move.uci(), "san": board.san(move), "score": round(score)} for move, score in lines],
+    }
+
+class AnalysisServer:
+    """
+    A tiny HTTP/JSON server (HTTP/1.1, one request per connection):
+      POST /analyse  {"fen": "...", "depth": 4, "movetime": 500, "nodes": 20000, "multipv": 3}
+                     (everything except "fen" is optional)
+      GET  /stats    batching and cache statistics
+    The searches run in a pool of worker threads; all of them share one BatchingEvaluator.
+    """
+    REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+    def __init__(self, evaluator, workers):
+        self.evaluator = evaluator
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.requests_served = 0
+
+    async def dispatch(self, method, path, body):
+        if method == "GET" and path == "/stats":
+            return 200, dict(self.evaluator.stats(), requests_served=self.requests_served)
+
+        if method == "POST" and path == "/analyse":
+            try:
+                request = json.loads(body or b"{}")
+                fen = request["fen"]
+                # Reject a bad FEN (or an impossible position, e.g. without a king) here, before it takes up a worker
+                if not chess.Board(fen).is_valid():
+                    return 400, {"error": "bad request: not a legal chess position"}
+                kwargs = {name: int(request[name]) for name in ("depth", "movetime", "nodes", "multipv")
+                          if request.get(name) is not None}
+            except (ValueError, KeyError, TypeError) as e:
+                return 400, {"error": f"bad request: {e}"}
+            if kwargs.get("multipv", 1) < 1:
+                return 400, {"error": "bad request: multipv must be at least 1"}
+            for name in ("depth", "movetime", "nodes"):
+                if name in kwargs and kwargs[name] <= 0:
+                    return 400, {"error": f"bad request: {name} must be greater than 0"}
+
+            loop = asyncio.get_running_loop()
+            try:
+                result = await loop.run_in_executor(self.executor, lambda: analyse(self.evaluator, fen, **kwargs))
+            except Exception as e:
+                # The request was fine, so anything going wrong in the search is OUR fault
+                return 500, {"error": f"analysis failed: {e}"}
+            self.requests_served += 1
+            return 200, result
+
+        return 404, {"error": f"unknown endpoint {method} {path}"}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            # 1. Request line and headers, e.g. "POST /analyse HTTP/1.1"
+            method, path, _ = (await reader.readline()).decode().split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            # 2. The JSON body
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            status, payload = await self.dispatch(method, path, body)
+        except (ValueError, asyncio.IncompleteReadError):
+            status, payload = 400, {"error": "malformed HTTP request"}
+        except Exception as e:
+            status, payload = 500, {"error": str(e)}
+
+        data = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status} {self.REASONS[status]}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n"
+                     f"Connection: close\r\n\r\n".encode() + data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+async def serve(server, host, port, unix_socket):
+    if unix_socket:
+        listener = await asyncio.start_unix_server(server.handle_connection, path=unix_socket)
+        print(f"Analysis server listening on unix socket {unix_socket}", file=sys.stderr)
+    else:
+        listener = await asyncio.start_server(server.handle_connection, host, port)
+        print(f"Analysis server listening on http://{host}:{port}", file=sys.stderr)
+    async with listener:
+        await listener.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Local analysis server with batched neural network evaluation.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=16, help="Searches that can run at the same time")
+    parser.add_argument("--max-batch", type=int, default=256, help="Most positions per network call")
+    parser.add_argument("--max-wait-ms", type=float, default=0.5,
+                        help="How long the inference worker waits for a batch to fill up")
+    args = parser.parse_args()
+
+    evaluator = BatchingEvaluator(load_ai_brain(), max_batch_size=args.max_batch, max_wait=args.max_wait_ms / 1000)
+    server = AnalysisServer(evaluator, args.workers)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
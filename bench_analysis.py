@@ -0,0 +1,70 @@
+import argparse
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# A mix of openings, middlegames and endgames to send to the server
+BENCH_FENS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3",
+    "r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4",
+    "rnbqkb1r/pp2pppp/3p1n2/8/3NP3/8/PPP2PPP/RNBQKB1R w KQkq - 1 5",
+    "r1bq1rk1/ppp2ppp/2np1n2/2b1p3/2B1P3/2NP1N2/PPP2PPP/R1BQ1RK1 w - - 0 7",
+    "r2q1rk1/pp2bppp/2n1pn2/3p4/3P4/2NBPN2/PP3PPP/R2Q1RK1 w - - 0 10",
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1",
+    "8/8/4k3/8/2K5/3P4/8/8 w - - 0 1",
+]
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test analysis_server.py with concurrent requests.")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--requests", type=int, default=64, help="Total number of analysis requests")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at the same time")
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--movetime", type=int, default=None, help="Milliseconds per request instead of a depth")
+    parser.add_argument("--multipv", type=int, default=1)
+    args = parser.parse_args()
+
+    payloads = []
+    for i in range(args.requests):
+        payload = {"fen": BENCH_FENS[i % len(BENCH_FENS)], "multipv": args.multipv}
+        if args.movetime:
+            payload["movetime"] = args.movetime
+        else:
+            payload["depth"] = args.depth
+        payloads.append(payload)
+
+    def timed_request(payload):
+        start = time.perf_counter()
+        result = post(args.url + "/analyse", payload)
+        return time.perf_counter() - start, result
+
+    print(f"--- Analysis Server Load Test: {args.requests} requests, {args.concurrency} at a time ---")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(timed_request, payloads))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    total_nodes = sum(result["nodes"] for _, result in results)
+    print(f"Throughput: {args.requests / elapsed:.2f} requests/sec | {total_nodes / elapsed:.0f} nodes/sec")
+    print(f"Latency:    p50 {percentile(latencies, 0.50):.1f} ms | p99 {percentile(latencies, 0.99):.1f} ms"
+          f" | max {latencies[-1]:.1f} ms")
+
+    with urllib.request.urlopen(args.url + "/stats") as response:
+        stats = json.loads(response.read())
+    print(f"Server:     avg batch size {stats['avg_batch_size']:.1f} | cache hit rate {stats['cache_hit_rate']:.1%}")
+
+if __name__ == "__main__":
+    main()
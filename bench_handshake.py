@@ -0,0 +1,65 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+UCI_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uci.py')
+
+def send(engine, command):
+    engine.stdin.write(command + "\n")
+    engine.stdin.flush()
+
+def wait_for(engine, prefix):
+    """
+    Reads the engine's output until a line starting with `prefix` shows up.
+    """
+    while True:
+        line = engine.stdout.readline()
+        if not line:
+            raise RuntimeError(f"engine exited before sending '{prefix}'")
+        if line.startswith(prefix):
+            return line.strip()
+
+def measure(depth):
+    """
+    Starts a fresh uci.py and returns how long (in ms) each step of the GUI handshake took.
+    """
+    start = time.perf_counter()
+    engine = subprocess.Popen([sys.executable, UCI_SCRIPT], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, text=True, bufsize=1)
+    timings = {}
+    try:
+        send(engine, "uci")
+        wait_for(engine, "uciok")
+        timings["uciok"] = (time.perf_counter() - start) * 1000
+
+        send(engine, "isready")
+        wait_for(engine, "readyok")
+        timings["readyok"] = (time.perf_counter() - start) * 1000
+
+        # The first search is the one that may have to wait for the network to finish loading
+        send(engine, "ucinewgame")
+        send(engine, "position startpos")
+        send(engine, f"go depth {depth}")
+        wait_for(engine, "bestmove")
+        timings["first bestmove"] = (time.perf_counter() - start) * 1000
+    finally:
+        send(engine, "quit")
+        engine.wait()
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how fast uci.py answers the GUI handshake.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh engine starts")
+    parser.add_argument("--depth", type=int, default=1, help="Depth of the first 'go'")
+    args = parser.parse_args()
+
+    print(f"--- UCI Handshake Latency ({args.runs} runs, ms since process start) ---")
+    runs = [measure(args.depth) for _ in range(args.runs)]
+    for step in runs[0]:
+        values = sorted(run[step] for run in runs)
+        print(f"{step:15s} | min {values[0]:8.1f} | median {values[len(values) // 2]:8.1f} | max {values[-1]:8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import time
+import torch
+import torch.nn as nn
+import torch.optim as optim
+from network import ChessNet
+from train_gcp import prepare_model, autocast
+
+# Every configuration we want to compare: (name, amp, channels_last, compile)
+CONFIGS = [
+    ("fp32 eager", False, False, False),
+    ("channels_last", False, True, False),
+    ("amp", True, False, False),
+    ("amp + channels_last", True, True, False),
+    ("compile", False, False, True),
+    ("amp + channels_last + compile", True, True, True),
+]
+
+def benchmark(device, batch_size, steps, warmup, amp, channels_last, compile_model):
+    """
+    Runs `steps` training steps on random boards and returns the number of samples per second.
+    Only the training step is timed: the data is already on the device, so the DataLoader is not involved.
+    """
+    torch.manual_seed(0)
+    model = prepare_model(ChessNet(), device, channels_last, compile_model)
+    model.train()
+    criterion = nn.MSELoss()
+    optimizer = optim.Adam(model.parameters(), lr=0.001)
+    scaler = torch.amp.GradScaler('cuda', enabled=amp and device.type == 'cuda')
+
+    memory_format = torch.channels_last if channels_last else torch.contiguous_format
+    boards = torch.rand((batch_size, 12, 8, 8), device=device).to(memory_format=memory_format)
+    evals = torch.rand((batch_size, 1), device=device) * 2 - 1
+
+    def step():
+        optimizer.zero_grad(set_to_none=True)
+        with autocast(device, amp):
+            loss = criterion(model(boards).float(), evals)
+        scaler.scale(loss).backward()
+        scaler.step(optimizer)
+        scaler.update()
+
+    # Warm-up: torch.compile does its (slow) compiling here, and the caches get filled
+    for _ in range(warmup):
+        step()
+    if device.type == 'cuda':
+        torch.cuda.synchronize()
+
+    start = time.perf_counter()
+    for _ in range(steps):
+        step()
+    if device.type == 'cuda':
+        torch.cuda.synchronize()
+    elapsed = time.perf_counter() - start
+
+    return batch_size * steps / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ChessNet training throughput for each speed-up.")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--steps", type=int, default=20, help="Timed training steps per configuration")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed steps before measuring")
+    parser.add_argument("--device", default='cuda' if torch.cuda.is_available() else 'cpu')
+    args = parser.parse_args()
+
+    device = torch.device(args.device)
+    print(f"--- Training Step Benchmark on {device} (batch size {args.batch_size}) ---")
+
+    baseline = None
+    for name, amp, channels_last, compile_model in CONFIGS:
+        try:
+            samples_per_sec = benchmark(device, args.batch_size, args.steps, args.warmup,
+                                        amp, channels_last, compile_model)
+        except Exception as e:
+            # e.g. torch.compile needs a working C++ compiler, and old CPUs may not support bf16
+            print(f"{name:32s} | unavailable ({type(e).__name__}: {e})")
+            continue
+
+        if baseline is None:
+            baseline = samples_per_sec
+        print(f"{name:32s} | {samples_per_sec:10.0f} samples/sec | {samples_per_sec / baseline:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+import argparse
+import os
+import time
+
+import chess
+
+# Endgame bitbases: for EVERY position of King + Queen/Rook/Pawn vs lone King we store ONE bit,
+# "does the side with the extra piece win?". We always store the position as if the stronger
+# side were White (a Black piece is mirrored to White), so each table covers both colors.
+#
+# Index of a position: side to move (0 = stronger side, 1 = lone king), then the stronger king,
+# the lone king and the extra piece: 2 * 64 * 64 * 64 = 524288 positions = 64 KB per table.
+TABLE_SIZE = 2 * 64 * 64 * 64
+BITBASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bitbases')
+TABLE_FILES = {chess.QUEEN: 'kqk.bin', chess.ROOK: 'krk.bin', chess.PAWN: 'kpk.bin'}
+
+# A bitbase win is scored below a real checkmate (99999), so the search still prefers the actual mate.
+# The table only says WIN or DRAW, so the extra piece's value and some "making progress" bonuses
+# decide between two winning moves: push the pawn, promote to a queen, shrink the box the lone king
+# is trapped in, drive it to the edge and walk our king towards it.
+BITBASE_WIN = 20000
+PIECE_BONUS = {chess.QUEEN: 900, chess.ROOK: 500, chess.PAWN: 100}
+
+def index(stm, strong_king, weak_king, piece_square):
+    return ((stm * 64 + strong_king) * 64 + weak_king) * 64 + piece_square
+
+# --- Probing (used by the search and the evaluators) ---
+
+_tables = None
+
+def load_tables(directory=BITBASE_DIR):
+    """
+    Reads the generated tables from disk (the first time only). Missing files are simply skipped.
+    """
+    global _tables
+    if _tables is None:
+        tables = {}
+        for piece_type, filename in TABLE_FILES.items():
+            path = os.path.join(directory, filename)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    tables[piece_type] = f.read()
+        _tables = tables
+    return _tables
+
+def progress_bonus(piece_type, strong_king, weak_king, piece_square):
+    if piece_type == chess.PAWN:
+        return 20 * chess.square_rank(piece_square)
+    # Lone king far from the center, kings close together: that's how the mate is built
+    weak_file, weak_rank = chess.square_file(weak_king), chess.square_rank(weak_king)
+    edge = max(3 - weak_file, weak_file - 4) + max(3 - weak_rank, weak_rank - 4)
+    
+    # The "box": the rectangle the piece's file and rank lock the lone king into
+    piece_file, piece_rank = chess.square_file(piece_square), chess.square_rank(piece_square)
+    width = piece_file if weak_file < piece_file else (7 - piece_file if weak_file > piece_file else 8)
+    height = piece_rank if weak_rank < piece_rank else (7 - piece_rank if weak_rank > piece_rank else 8)
+    
+    return 10 * edge - 5 * chess.square_distance(strong_king, weak_king) - 4 * width * height
+
+def probe_bitbase(board):
+    """
+    The exact result of a KQK, KRK or KPK position in O(1), from White's point of view:
+    0 for a draw, about +/-20000 for a win. Returns None for any other position
+    (or when the tables have not been generated with `python bitbase.py`).
+    """
+    # Exactly two kings and one other piece (python-chess also accepts boards without a king)
+    if chess.popcount(board.occupied) != 3 or board.king(chess.WHITE) is None or board.king(chess.BLACK) is None:
+        return None
+    tables = load_tables()
+
+    piece_square = chess.lsb(board.occupied & ~board.kings)
+    piece = board.piece_at(piece_square)
+    table = tables.get(piece.piece_type)
+    if table is None:
+        return None
+
+    strong_king = board.king(piece.color)
+    weak_king = board.king(not piece.color)
+    if piece.color == chess.BLACK:
+        # Flip the board upside down so the stronger side plays "up the board" like White
+        strong_king, weak_king, piece_square = (chess.square_mirror(strong_king), chess.square_mirror(weak_king),
+                                                chess.square_mirror(piece_square))
+    i = index(0 if board.turn == piece.color else 1, strong_king, weak_king, piece_square)
+    if not (table[i >> 3] >> (i & 7)) & 1:
+        return 0
+
+    score = BITBASE_WIN + PIECE_BONUS[piece.piece_type] + progress_bonus(piece.piece_type, strong_king, weak_king, piece_square)
+    return score if piece.color == chess.WHITE else -score
+
+# --- Generation (retrograde analysis, run once offline) ---
+
+def bit(square):
+    return 1 << square
+
+def piece_attacks(piece_type, square, occupied):
+    if piece_type == chess.PAWN:
+        return chess.BB_PAWN_ATTACKS[chess.WHITE][square]
+    attacks = 0
+    if piece_type in (chess.QUEEN, chess.ROOK):
+        attacks |= chess.BB_RANK_ATTACKS[square][chess.BB_RANK_MASKS[square] & occupied]
+        attacks |= chess.BB_FILE_ATTACKS[square][chess.BB_FILE_MASKS[square] & occupied]
+    if piece_type == chess.QUEEN:
+        attacks |= chess.BB_DIAG_ATTACKS[square][chess.BB_DIAG_MASKS[square] & occupied]
+    return attacks
+
+def is_legal(stm, strong_king, weak_king, piece_type, piece_square):
+    if len({strong_king, weak_king, piece_square}) < 3:
+        return False
+    if chess.BB_KING_ATTACKS[strong_king] & bit(weak_king):
+        return False
+    if piece_type == chess.PAWN and chess.square_rank(piece_square) in (0, 7):
+        return False
+    # With the stronger side to move, the lone king can't already be in check
+    occupied = bit(strong_king) | bit(weak_king) | bit(piece_square)
+    if stm == 0 and piece_attacks(piece_type, piece_square, occupied) & bit(weak_king):
+        return False
+    return True
+
+def strong_side_wins(win, promotions, piece_type, strong_king, weak_king, piece_square):
+    """
+    Stronger side to move: it wins if ANY of its moves reaches a won position.
+    """
+    occupied = bit(strong_king) | bit(weak_king) | bit(piece_square)
+
+    # 1. King moves (never next to the other king, never onto our own piece)
+    targets = chess.BB_KING_ATTACKS[strong_king] & ~chess.BB_KING_ATTACKS[weak_king] & ~occupied
+    for to in chess.scan_forward(targets):
+        if win[index(1, to, weak_king, piece_square)]:
+            return True
+
+    # 2. Piece moves
+    if piece_type == chess.PAWN:
+        push = piece_square + 8
+        if occupied & bit(push):
+            return False
+        if chess.square_rank(push) == 7:
+            # Promotion: the result is in the (already finished) queen and rook tables
+            return any(table[index(1, strong_king, weak_king, push)] for table in promotions)
+        if win[index(1, strong_king, weak_king, push)]:
+            return True
+        double_push = piece_square + 16
+        if chess.square_rank(piece_square) == 1 and not occupied & bit(double_push):
+            return bool(win[index(1, strong_king, weak_king, double_push)])
+        return False
+
+    for to in chess.scan_forward(piece_attacks(piece_type, piece_square, occupied) & ~occupied):
+        if win[index(1, strong_king, weak_king, to)]:
+            return True
+    return False
+
+def weak_side_loses(win, piece_type, strong_king, weak_king, piece_square):
+    """
+    Lone king to move: it loses if it is checkmated, or if EVERY move reaches a won position.
+    """
+    # The lone king doesn't block the piece's attacks along the line it is escaping on
+    attacked = chess.BB_KING_ATTACKS[strong_king] | \
+        piece_attacks(piece_type, piece_square, bit(strong_king) | bit(piece_square))
+
+    has_move = False
+    for to in chess.scan_forward(chess.BB_KING_ATTACKS[weak_king] & ~bit(strong_king)):
+        if to == piece_square:
+            if not chess.BB_KING_ATTACKS[strong_king] & bit(piece_square):
+                return False # It can take the undefended piece: King vs King is a draw
+            continue
+        if attacked & bit(to):
+            continue
+        has_move = True
+        if not win[index(0, strong_king, to, piece_square)]:
+            return False
+
+    if not has_move:
+        return bool(attacked & bit(weak_king)) # Checkmate wins, stalemate is a draw
+    return True
+
+def generate(piece_type, promotions=()):
+    """
+    Retrograde analysis: start with nothing marked as won, then keep sweeping over the
+    undecided positions, marking a position as won as soon as its moves prove it.
+    When a whole sweep changes nothing, every position still undecided is a draw.
+    """
+    win = bytearray(TABLE_SIZE)
+    undecided = [
+        (stm, strong_king, weak_king, piece_square)
+        for stm in (0, 1) for strong_king in range(64) for weak_king in range(64) for piece_square in range(64)
+        if is_legal(stm, strong_king, weak_king, piece_type, piece_square)
+    ]
+    legal_positions = len(undecided)
+
+    sweep = 0
+    while True:
+        sweep += 1
+        still_undecided = []
+        for position in undecided:
+            stm, strong_king, weak_king, piece_square = position
+            if stm == 0:
+                won = strong_side_wins(win, promotions, piece_type, strong_king, weak_king, piece_square)
+            else:
+                won = weak_side_loses(win, piece_type, strong_king, weak_king, piece_square)
+            if won:
+                win[index(stm, strong_king, weak_king, piece_square)] = 1
+            else:
+                still_undecided.append(position)
+        changed = len(undecided) - len(still_undecided)
+        undecided = still_undecided
+        if changed == 0:
+            break
+
+    print(f"{TABLE_FILES[piece_type]}: {legal_positions} legal positions, "
+          f"{legal_positions - len(undecided)} wins, {len(undecided)} draws ({sweep} sweeps)")
+    return win
+
+def pack_bits(win):
+    """
+    8 positions per byte: position i is bit (i % 8) of byte (i // 8).
+    """
+    packed = bytearray(TABLE_SIZE // 8)
+    for i in range(TABLE_SIZE):
+        if win[i]:
+            packed[i >> 3] |= 1 << (i & 7)
+    return bytes(packed)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the KQK, KRK and KPK endgame bitbases.")
+    parser.add_argument("--out", default=BITBASE_DIR, help="Directory to write the tables to")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    print("--- Generating Endgame Bitbases ---")
+    start = time.perf_counter()
+
+    # Queen and rook first: pawn promotions look their results up in these two tables
+    queen = generate(chess.QUEEN)
+    rook = generate(chess.ROOK)
+    pawn = generate(chess.PAWN, promotions=(queen, rook))
+
+    for piece_type, win in ((chess.QUEEN, queen), (chess.ROOK, rook), (chess.PAWN, pawn)):
+        with open(os.path.join(args.out, TABLE_FILES[piece_type]), 'wb') as f:
+            f.write(pack_bits(win))
+    print(f"Done in {time.perf_counter() - start:.0f}s, tables written to {args.out}")
+
+if __name__ == "__main__":
+    main()
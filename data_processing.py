@@ -35,6 +35,40 @@ def board_to_tensor(board):
 
     return tensor
 
+# Self-play records are stored back to back in a flat binary file, 100 bytes each:
+# - planes: the 8x8x12 tensor squeezed into 768 bits (96 bytes) with np.packbits
+# - turn:   1 if White is to move, 0 if Black is to move
+# - score:  the search score in centipawns (White's point of view), clipped to int16
+# - result: the final game result, +1 White won, 0 draw, -1 Black won
+# Because every record has the same size, the training code can np.memmap the file
+# and jump straight to record N without parsing anything.
+RECORD_DTYPE = np.dtype([
+    ('planes', np.uint8, (96,)),
+    ('turn', np.uint8),
+    ('score', '<i2'),
+    ('result', np.int8),
+])
+
+# The dataset index written by preprocess_dataset.py: one 12-byte entry per UNIQUE position.
+# - offset: where the position's row starts in the original CSV (in bytes), so we can seek straight to its FEN
+# - eval:   the average evaluation (centipawns) over every duplicate/transposition of that position
+INDEX_DTYPE = np.dtype([
+    ('offset', '<u8'),
+    ('eval', '<f4'),
+])
+
+def board_to_packed(board):
+    """
+    Converts a python-chess board into the 96-byte bit-packed form used by RECORD_DTYPE.
+    """
+    return np.packbits(board_to_tensor(board).reshape(-1).astype(np.uint8))
+
+def packed_to_tensor(packed):
+    """
+    The reverse of board_to_packed(): turns 96 packed bytes back into an (8, 8, 12) float tensor.
+    """
+    return np.unpackbits(np.asarray(packed, dtype=np.uint8)).reshape(8, 8, 12).astype(np.float32)
+
 def main():
     board = chess.Board()
     print("--- Current Board ---")
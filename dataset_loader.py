@@ -1,8 +1,11 @@
+import json
+import os
+
 import torch
 from torch.utils.data import Dataset
 import chess
 import numpy as np
-from data_processing import board_to_tensor
+from data_processing import board_to_tensor, packed_to_tensor, RECORD_DTYPE, INDEX_DTYPE
 
 class ChessDataset(Dataset):
     """
@@ -42,3 +45,80 @@ class ChessDataset(Dataset):
         
         # 6. Return them both as PyTorch Tensors
         return torch.tensor(tensor, dtype=torch.float32), torch.tensor(target, dtype=torch.float32)
+
+    @classmethod
+    def from_index(cls, index_path, csv_path=None):
+        """
+        Loads a train.idx / val.idx file written by preprocess_dataset.py.
+        Only the 12-byte index entries are kept in RAM; the FENs are read from the CSV when a batch needs them.
+        """
+        if csv_path is None:
+            # meta.json (next to the index) remembers which CSV the offsets point into
+            with open(os.path.join(os.path.dirname(index_path), "meta.json")) as f:
+                csv_path = json.load(f)["csv"]
+        entries = np.fromfile(index_path, dtype=INDEX_DTYPE)
+        return cls(CsvFenList(csv_path, entries['offset']), entries['eval'])
+
+class CsvFenList:
+    """
+    Looks like a list of FEN strings, but only stores byte offsets into the CSV.
+    fens[i] seeks to the row and reads its FEN, so 16M positions cost 8 bytes each instead of a Python string.
+    """
+    def __init__(self, csv_path, offsets):
+        self.csv_path = csv_path
+        self.offsets = offsets
+        self.file = None
+        self.pid = None
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, idx):
+        # Every DataLoader worker process opens its own file handle (a shared one would mix up the seeks)
+        if self.pid != os.getpid():
+            self.file = open(self.csv_path, 'rb')
+            self.pid = os.getpid()
+        self.file.seek(int(self.offsets[idx]))
+        return self.file.readline().split(b',', 1)[0].decode()
+
+    def __getstate__(self):
+        # Open files can't be sent to worker processes, each worker opens the CSV again
+        state = dict(self.__dict__)
+        state['file'], state['pid'] = None, None
+        return state
+
+class SelfPlayDataset(Dataset):
+    """
+    A PyTorch Dataset that reads the binary records written by selfplay.py.
+    The file is memory-mapped, so even a huge self-play file costs almost no RAM:
+    the operating system only pages in the records a batch actually touches.
+    
+    result_weight blends the search score with the final game result:
+    0.0 trains purely on the search score, 1.0 trains purely on who won the game.
+    """
+    def __init__(self, path, result_weight=0.0):
+        # If selfplay.py was killed halfway through a write, the file ends in a partial record.
+        # We only map the whole records, so the rest of the file can still be trained on.
+        file_size = os.path.getsize(path)
+        num_records = file_size // RECORD_DTYPE.itemsize
+        if file_size % RECORD_DTYPE.itemsize:
+            print(f"Warning: {path} ends in a partial record, ignoring its last "
+                  f"{file_size % RECORD_DTYPE.itemsize} bytes")
+        self.records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', shape=(num_records,))
+        self.result_weight = result_weight
+        
+    def __len__(self):
+        return len(self.records)
+        
+    def __getitem__(self, idx):
+        record = self.records[idx]
+        
+        # 1. Unpack the 96 bytes back into our (8x8x12) tensor, then go to (Channels, Height, Width)
+        tensor = np.transpose(packed_to_tensor(record['planes']), (2, 0, 1))
+        
+        # 2. Use the same centipawn scaling as ChessDataset (+1000 = forced win = 1.0)
+        score = np.clip(float(record['score']) / 1000.0, -1.0, 1.0)
+        value = (1.0 - self.result_weight) * score + self.result_weight * float(record['result'])
+        target = np.array([value], dtype=np.float32)
+        
+        return torch.tensor(tensor, dtype=torch.float32), torch.tensor(target, dtype=torch.float32)
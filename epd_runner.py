@@ -0,0 +1,165 @@
+import argparse
+import json
+import multiprocessing as mp
+import sys
+import time
+
+import chess
+from alphabeta import SearchState, iterative_deepening, MAX_DEPTH
+from pool_worker import init_worker, worker_eval_func
+
+# The solve-rate table reports how many positions were solved within each of these limits
+TIME_STEPS = [0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 30, 60]
+NODE_STEPS = [100, 300, 1000, 3000, 10000, 30000, 100000, 300000, 1000000]
+
+def read_epd(path):
+    """
+    Returns the non-empty, non-comment lines of an EPD file.
+    e.g. 'r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - bm Qxf7#; id "scholar";'
+    """
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+def is_correct(move, best_moves, avoid_moves):
+    """
+    EPD 'bm' lists the moves that solve the position, 'am' the moves that must be avoided.
+    """
+    if best_moves and move not in best_moves:
+        return False
+    return move not in avoid_moves
+
+def solve_position(task):
+    """
+    Searches ONE position and records after every finished depth whether the engine had found the answer.
+    task = (index, epd line, time limit in seconds or None, node limit or None)
+    """
+    index, epd, time_limit, node_limit = task
+    try:
+        board, operations = chess.Board.from_epd(epd)
+    except ValueError as e:
+        # A broken line (bad FEN, or a bm/am move that isn't legal) only fails THIS position, not the suite
+        return unparsable_result(index, epd, e)
+    best_moves = operations.get("bm", [])
+    avoid_moves = operations.get("am", [])
+    if not best_moves and not avoid_moves:
+        # Without a bm or am there is nothing to check, every move would count as "solved"
+        return dict(unparsable_result(index, epd, "no bm or am operation"), skipped=True)
+
+    iterations = []
+    def on_depth(depth, lines, nodes, seconds):
+        if lines:
+            move = lines[0][0]
+            iterations.append({"depth": depth, "move": board.san(move), "seconds": seconds, "nodes": nodes,
+                               "correct": is_correct(move, best_moves, avoid_moves)})
+
+    iterative_deepening(board, MAX_DEPTH, eval_func=worker_eval_func(), state=SearchState(),
+                        time_limit=time_limit, node_limit=node_limit, on_depth=on_depth)
+
+    # The position counts as solved from the first depth after which the engine NEVER changed its mind again
+    solved_at = None
+    for iteration in reversed(iterations):
+        if not iteration["correct"]:
+            break
+        solved_at = iteration
+
+    return {
+        "index": index,
+        "id": operations.get("id", str(index + 1)),
+        "fen": board.fen(),
+        "bm": [board.san(move) for move in best_moves],
+        "am": [board.san(move) for move in avoid_moves],
+        "move": iterations[-1]["move"] if iterations else None,
+        "solved": solved_at is not None,
+        "solved_depth": solved_at["depth"] if solved_at else None,
+        "solved_seconds": solved_at["seconds"] if solved_at else None,
+        "solved_nodes": solved_at["nodes"] if solved_at else None,
+        "depth": iterations[-1]["depth"] if iterations else 0,
+        "iterations": iterations,
+    }
+
+def unparsable_result(index, epd, error):
+    """
+    The result of a position we could not search: it counts as failed in the solve rate.
+    """
+    return {
+        "index": index,
+        "id": str(index + 1),
+        "fen": None,
+        "epd": epd,
+        "bm": [], "am": [],
+        "move": None,
+        "solved": False,
+        "solved_depth": None, "solved_seconds": None, "solved_nodes": None,
+        "depth": 0,
+        "iterations": [],
+        "error": str(error),
+    }
+
+def solve_rate_curve(results, key, steps):
+    """
+    For every step (seconds or nodes): how many positions were solved within that limit.
+    """
+    curve = []
+    for step in steps:
+        solved = sum(1 for result in results if result["solved"] and result[key] <= step)
+        curve.append({"limit": step, "solved": solved, "rate": solved / len(results) if results else 0.0})
+    return curve
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an EPD test suite (bm/am) in parallel worker processes.")
+    parser.add_argument("epd", help="EPD file, one position per line")
+    parser.add_argument("--time", type=float, default=None, help="Seconds per position")
+    parser.add_argument("--nodes", type=int, default=None, help="Nodes per position (instead of --time)")
+    parser.add_argument("--workers", type=int, default=mp.cpu_count(), help="Number of worker processes")
+    parser.add_argument("--ai", action="store_true", help="Search with the neural network instead of material")
+    parser.add_argument("--json", default=None, help="Write the per-position results and the curve here")
+    args = parser.parse_args()
+
+    if args.time is None and args.nodes is None:
+        args.time = 1.0
+    if args.nodes is not None:
+        key, steps, limit, unit = "solved_nodes", NODE_STEPS, args.nodes, " nodes"
+    else:
+        key, steps, limit, unit = "solved_seconds", TIME_STEPS, args.time, "s"
+    steps = [step for step in steps if step < limit] + [limit]
+
+    lines = read_epd(args.epd)
+    tasks = [(index, line, args.time if args.nodes is None else None, args.nodes) for index, line in enumerate(lines)]
+    print(f"--- EPD Suite: {len(lines)} positions, {limit}{unit} each, {args.workers} workers ---")
+
+    results = []
+    skipped = 0
+    start = time.perf_counter()
+    with mp.Pool(args.workers, initializer=init_worker, initargs=(args.ai,)) as pool:
+        for done, result in enumerate(pool.imap_unordered(solve_position, tasks), start=1):
+            if result.get("skipped"):
+                print(f"[{done}/{len(lines)}] line {result['index'] + 1}: skipped, {result['error']}", file=sys.stderr)
+                skipped += 1
+                continue
+            results.append(result)
+            if "error" in result:
+                print(f"[{done}/{len(lines)}] line {result['index'] + 1}: FAILED, could not parse ({result['error']})",
+                      file=sys.stderr)
+                continue
+            status = f"solved at depth {result['solved_depth']}" if result["solved"] else "FAILED"
+            print(f"[{done}/{len(lines)}] {result['id']}: played {result['move']} "
+                  f"(bm {' '.join(result['bm']) or '-'} am {' '.join(result['am']) or '-'}) {status}",
+                  file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    results.sort(key=lambda result: result["index"])
+
+    curve = solve_rate_curve(results, key, steps)
+    print(f"\n{'limit':>14} | {'solved':>7} | rate")
+    for point in curve:
+        print(f"{str(point['limit']) + unit:>14} | {point['solved']:>7} | {point['rate']:6.1%}")
+    print(f"\nSolved {curve[-1]['solved']}/{len(results)} in {elapsed:.1f}s wall time")
+    if skipped:
+        print(f"({skipped} lines without bm/am were skipped)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"limit": limit, "unit": unit.strip(), "curve": curve, "positions": results}, f, indent=2)
+        print(f"Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
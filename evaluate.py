@@ -1,4 +1,5 @@
 import chess
+from bitbase import probe_bitbase
 
 # Piece values are usually tracked in "centipawns"
 # 100 centipawns = 1 Pawn
@@ -30,7 +31,12 @@ def evaluate_board(board):
     if board.is_game_over():
         return 0 
     
-    # 3. Count the material
+    # 3. King + Queen/Rook/Pawn vs King? The endgame bitbase knows the real result!
+    bitbase_score = probe_bitbase(board)
+    if bitbase_score is not None:
+        return bitbase_score
+    
+    # 4. Count the material
     evaluation = 0
     for square in chess.SQUARES: # Loop through all 64 squares
         piece = board.piece_at(square)
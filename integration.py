@@ -1,27 +1,42 @@
 import chess
 import torch
+import threading
 from network import ChessNet
 from data_processing import board_to_tensor
-from alphabeta import minimax_alpha_beta
+from alphabeta import search_root
+from bitbase import probe_bitbase
 
 import os
+import sys
 
-# 1. Load our trained AI Brain
-ai_brain = ChessNet()
-model_path = os.path.join(os.path.dirname(__file__), 'best_model.pth')
-if os.path.exists(model_path):
-    import sys
-    print("Loading trained weights from best_model.pth...", file=sys.stderr)
-    ai_brain.load_state_dict(torch.load(model_path, map_location=torch.device('cpu')))
-else:
-    import sys
-    print("WARNING: best_model.pth not found! Using untrained random weights.", file=sys.stderr)
-    
-ai_brain.eval() # Tell PyTorch we are Evaluating, not Training
+# 1. Our trained AI Brain
+# Building the network and reading best_model.pth is slow, so we don't do it at import time.
+# load_ai_brain() does it the first time somebody actually needs the network.
+ai_brain = None
+_brain_lock = threading.Lock() # uci.py loads the brain from a background thread
 
-def ai_evaluate_board(board):
+def load_ai_brain():
     """
-    Replaces our old material-counting evaluate_board() with our Deep Learning model!
+    Builds the ChessNet and loads the trained weights. Only the first call does any work.
+    """
+    global ai_brain
+    with _brain_lock:
+        if ai_brain is None:
+            brain = ChessNet()
+            model_path = os.path.join(os.path.dirname(__file__), 'best_model.pth')
+            if os.path.exists(model_path):
+                print("Loading trained weights from best_model.pth...", file=sys.stderr)
+                brain.load_state_dict(torch.load(model_path, map_location=torch.device('cpu')))
+            else:
+                print("WARNING: best_model.pth not found! Using untrained random weights.", file=sys.stderr)
+                
+            brain.eval() # Tell PyTorch we are Evaluating, not Training
+            ai_brain = brain
+    return ai_brain
+
+def game_over_score(board):
+    """
+    The exact score of a finished game (no network needed!), or None if the game is still going.
     """
     if board.is_checkmate():
         if board.turn == chess.WHITE:
@@ -32,6 +47,18 @@ def ai_evaluate_board(board):
     if board.is_game_over():
         return 0 # Draw
         
+    return None
+
+def ai_evaluate_board(board):
+    """
+    Replaces our old material-counting evaluate_board() with our Deep Learning model!
+    """
+    score = game_over_score(board)
+    if score is None:
+        score = probe_bitbase(board) # Exact result in KQK/KRK/KPK endgames
+    if score is not None:
+        return score
+        
     # 1. Convert the python-chess board into a math tensor
     tensor = board_to_tensor(board)
     
@@ -42,40 +69,15 @@ def ai_evaluate_board(board):
     
     # 3. Ask the AI for its opinion!
     with torch.no_grad(): # Tell PyTorch not to track gradients (saves memory/time)
-        evaluation = ai_brain(tensor)
+        brain = ai_brain if ai_brain is not None else load_ai_brain()
+        evaluation = brain(tensor)
         
     # 4. Extract the single number from the tensor (-1 to 1) and scale it 
     # Let's multiply by 1000 so the Minimax algorithm works with centipawns like before!
     return evaluation.item() * 1000
 
 def get_best_move_with_ai(board, depth):
-    alpha = -float('inf')
-    beta = float('inf')
-    best_move = None
-    
-    if board.turn == chess.WHITE:
-        best_eval = -float('inf')
-        for move in board.legal_moves:
-            board.push(move)
-            eval_score = minimax_alpha_beta(board, depth - 1, alpha, beta, False, eval_func=ai_evaluate_board)
-            board.pop()
-            
-            if eval_score > best_eval:
-                best_eval = eval_score
-                best_move = move
-            alpha = max(alpha, eval_score)
-    else:
-        best_eval = float('inf')
-        for move in board.legal_moves:
-            board.push(move)
-            eval_score = minimax_alpha_beta(board, depth - 1, alpha, beta, True, eval_func=ai_evaluate_board)
-            board.pop()
-            
-            if eval_score < best_eval:
-                best_eval = eval_score
-                best_move = move
-            beta = min(beta, eval_score)
-                
+    best_move, _ = search_root(board, depth, eval_func=ai_evaluate_board)
     return best_move
 
 def main():
@@ -0,0 +1,294 @@
+import argparse
+import math
+import os
+import shlex
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import chess
+import chess.engine
+
+UCI_COMMAND = f"{shlex.quote(sys.executable)} {shlex.quote(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uci.py'))}"
+
+# Short, well-known openings that leave both sides with a roughly equal game.
+# Every opening is played twice, once with each engine as White, so neither side gets the easier half.
+BALANCED_OPENINGS = [
+    "e4 e5 Nf3 Nc6 Bb5 a6",
+    "e4 e5 Nf3 Nc6 Bc4 Bc5",
+    "e4 e5 Nf3 Nf6 Nxe5 d6",
+    "e4 c5 Nf3 d6 d4 cxd4",
+    "e4 c5 Nf3 Nc6 d4 cxd4",
+    "e4 c5 Nc3 Nc6 g3 g6",
+    "e4 e6 d4 d5 Nc3 Nf6",
+    "e4 e6 d4 d5 Nd2 c5",
+    "e4 c6 d4 d5 Nc3 dxe4",
+    "e4 c6 d4 d5 e5 Bf5",
+    "e4 d5 exd5 Qxd5 Nc3 Qa5",
+    "e4 d6 d4 Nf6 Nc3 g6",
+    "d4 d5 c4 e6 Nc3 Nf6",
+    "d4 d5 c4 c6 Nf3 Nf6",
+    "d4 d5 c4 dxc4 Nf3 Nf6",
+    "d4 Nf6 c4 g6 Nc3 Bg7",
+    "d4 Nf6 c4 e6 Nc3 Bb4",
+    "d4 Nf6 c4 e6 Nf3 b6",
+    "d4 Nf6 c4 c5 d5 e6",
+    "d4 f5 g3 Nf6 Bg2 g6",
+    "c4 e5 Nc3 Nf6 Nf3 Nc6",
+    "c4 c5 Nf3 Nf6 Nc3 Nc6",
+    "Nf3 d5 g3 Nf6 Bg2 e6",
+    "Nf3 Nf6 c4 g6 Nc3 d5",
+]
+
+def expected_score(elo):
+    """
+    The score (0 to 1) an engine that is `elo` points stronger is expected to make.
+    """
+    return 1 / (1 + 10 ** (-elo / 400))
+
+def elo_from_score(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+def score_stats(wins, draws, losses):
+    """
+    Returns (mean score per game, variance of the mean score) for a match.
+    """
+    games = wins + draws + losses
+    mean = (wins + draws / 2) / games
+    variance = (wins * (1 - mean) ** 2 + draws * (0.5 - mean) ** 2 + losses * (0 - mean) ** 2) / games
+    return mean, variance / games
+
+def elo_estimate(wins, draws, losses):
+    """
+    Elo difference of engine 1 over engine 2, with the half-width of its 95% confidence interval.
+    """
+    mean, variance = score_stats(wins, draws, losses)
+    margin = 1.96 * math.sqrt(variance)
+    elo = elo_from_score(mean)
+    error = (elo_from_score(min(mean + margin, 1)) - elo_from_score(max(mean - margin, 0))) / 2
+    return elo, error
+
+def sprt_llr(wins, draws, losses, elo0, elo1):
+    """
+    Log-likelihood ratio of "engine 1 is elo1 stronger" (H1) against "engine 1 is elo0 stronger" (H0),
+    using the usual normal approximation of the game results (the same formula fishtest uses).
+    """
+    if wins + draws + losses == 0:
+        return 0.0
+    # Like fishtest, add half a game to each result first: with zero wins (or zero losses) the
+    # variance would otherwise be underestimated, and a one-sided match needs to stop early too
+    mean, variance = score_stats(wins + 0.5, draws + 0.5, losses + 0.5)
+    if variance == 0:
+        return 0.0
+    score0, score1 = expected_score(elo0), expected_score(elo1)
+    return (score1 - score0) * (2 * mean - score0 - score1) / (2 * variance)
+
+def sprt_bounds(alpha, beta):
+    """
+    Stop and accept H1 when the LLR reaches the upper bound, accept H0 at the lower bound.
+    alpha: chance of accepting H1 when H0 is true, beta: chance of accepting H0 when H1 is true.
+    """
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+class EngineStats:
+    """
+    Adds up the search statistics an engine reports for its moves.
+    """
+    def __init__(self):
+        self.moves = 0
+        self.nodes = 0
+        self.seconds = 0.0
+        self.depth = 0
+
+    def add(self, info, seconds):
+        self.moves += 1
+        self.nodes += info.get("nodes", 0)
+        self.depth += info.get("depth", 0)
+        # Prefer the engine's own search time: the wall clock also counts process and pipe overhead
+        self.seconds += info.get("time", seconds)
+
+    def summary(self):
+        if self.moves == 0:
+            return "no moves"
+        return f"avg nps {self.nodes / self.seconds if self.seconds else 0:8.0f} | avg depth {self.depth / self.moves:.2f}"
+
+def play_game(engines, opening, first_is_white, args, stats):
+    """
+    Plays one game. engines = (engine 1, engine 2).
+    Returns the result from engine 1's point of view: 1, 0.5 or 0.
+    """
+    board = chess.Board()
+    for san in opening.split():
+        board.push_san(san)
+
+    white, black = (0, 1) if first_is_white else (1, 0)
+    # python-chess sends 'ucinewgame' whenever this changes, so engines forget the last game
+    game_id = object()
+    clocks = [args.base, args.base] # Remaining seconds of engine 1 and engine 2
+
+    while True:
+        # 1. Adjudicate with python-chess: checkmate, stalemate, repetition, 50 moves, no material
+        outcome = board.outcome(claim_draw=True)
+        if outcome is not None:
+            if outcome.winner is None:
+                return 0.5
+            return 1.0 if (outcome.winner == chess.WHITE) == first_is_white else 0.0
+        if board.ply() >= args.max_plies:
+            return 0.5
+
+        side = white if board.turn == chess.WHITE else black
+        if args.movetime:
+            limit = chess.engine.Limit(time=args.movetime / 1000)
+        else:
+            limit = chess.engine.Limit(white_clock=clocks[white], black_clock=clocks[black],
+                                       white_inc=args.inc, black_inc=args.inc)
+
+        start = time.perf_counter()
+        result = engines[side].play(board, limit, game=game_id, info=chess.engine.INFO_BASIC)
+        elapsed = time.perf_counter() - start
+        stats[side].add(result.info, elapsed)
+
+        # 2. The engine that ran out of time (or played no move) loses the game
+        if not args.movetime:
+            clocks[side] += args.inc - elapsed
+            if clocks[side] < 0:
+                return 0.0 if side == 0 else 1.0
+        if result.move is None or result.move not in board.legal_moves:
+            return 0.0 if side == 0 else 1.0
+        board.push(result.move)
+
+class Match:
+    """
+    Runs games on several threads at once. Each thread owns one process of each engine
+    and keeps playing game pairs until the SPRT reaches a decision or the game limit is hit.
+    """
+    def __init__(self, args):
+        self.args = args
+        self.lock = threading.Lock()
+        self.wins = self.draws = self.losses = 0
+        self.next_game = 0
+        self.finished = False
+        self.stats = (EngineStats(), EngineStats())
+        self.lower_bound, self.upper_bound = sprt_bounds(args.alpha, args.beta)
+        self.verdict = None
+
+    def take_game(self):
+        with self.lock:
+            if self.finished or self.next_game >= self.args.games:
+                return None
+            game = self.next_game
+            self.next_game += 1
+            return game
+
+    def record(self, game, score):
+        with self.lock:
+            if score == 1.0:
+                self.wins += 1
+            elif score == 0.0:
+                self.losses += 1
+            else:
+                self.draws += 1
+
+            elo, error = elo_estimate(self.wins, self.draws, self.losses)
+            llr = sprt_llr(self.wins, self.draws, self.losses, self.args.elo0, self.args.elo1)
+            played = self.wins + self.draws + self.losses
+            print(f"Game {played:4d} (#{game + 1}) | +{self.wins} ={self.draws} -{self.losses} | "
+                  f"Elo {elo:+.1f} +/- {error:.1f} | LLR {llr:+.2f} [{self.lower_bound:.2f}, {self.upper_bound:.2f}]")
+            sys.stdout.flush()
+
+            if self.verdict is None:
+                if llr >= self.upper_bound:
+                    self.verdict = f"H1 accepted: engine 1 gains about {self.args.elo1} Elo or more"
+                elif llr <= self.lower_bound:
+                    self.verdict = f"H0 accepted: engine 1 gains {self.args.elo0} Elo or less"
+                if self.verdict is not None:
+                    self.finished = True # Games already running still finish and count
+
+    def open_engine(self, command, options):
+        # One thread per engine process: the games in parallel are what use the cores
+        env = dict(os.environ, OMP_NUM_THREADS="1")
+        engine = chess.engine.SimpleEngine.popen_uci(shlex.split(command), env=env)
+        if options:
+            engine.configure(options)
+        return engine
+
+    def worker(self):
+        engines = (self.open_engine(self.args.engine1, self.args.options1),
+                   self.open_engine(self.args.engine2, self.args.options2))
+        try:
+            while True:
+                game = self.take_game()
+                if game is None:
+                    break
+                # Games 0 and 1 use opening 0 with swapped colors, games 2 and 3 opening 1, ...
+                opening = self.args.openings[(game // 2) % len(self.args.openings)]
+                score = play_game(engines, opening, game % 2 == 0, self.args, self.stats)
+                self.record(game, score)
+        finally:
+            for engine in engines:
+                engine.quit()
+
+    def run(self):
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as pool:
+            for future in [pool.submit(self.worker) for _ in range(self.args.concurrency)]:
+                future.result()
+
+def parse_options(pairs):
+    options = {}
+    for pair in pairs:
+        name, _, value = pair.partition("=")
+        options[name] = value
+    return options
+
+def load_openings(path):
+    """
+    One opening per line, in SAN ("e4 e5 Nf3 Nc6"). Empty lines and lines starting with # are skipped.
+    """
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+def main():
+    parser = argparse.ArgumentParser(description="Play two uci.py configurations against each other with SPRT.")
+    parser.add_argument("--engine1", default=UCI_COMMAND, help="Command that starts engine 1 (the candidate)")
+    parser.add_argument("--engine2", default=UCI_COMMAND, help="Command that starts engine 2 (the baseline)")
+    parser.add_argument("--option1", action="append", default=[], help="UCI option for engine 1, e.g. Eval=material")
+    parser.add_argument("--option2", action="append", default=[], help="UCI option for engine 2")
+    parser.add_argument("--games", type=int, default=1000, help="Stop after this many games even without a verdict")
+    parser.add_argument("--concurrency", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Games played at the same time (each game uses two engine processes)")
+    parser.add_argument("--tc", default="10+0.1", help="Time control per game: base+increment in seconds")
+    parser.add_argument("--movetime", type=int, default=None, help="Fixed milliseconds per move instead of --tc")
+    parser.add_argument("--max-plies", type=int, default=300, help="Adjudicate longer games as draws")
+    parser.add_argument("--openings", default=None, help="File with one SAN opening per line")
+    parser.add_argument("--elo0", type=float, default=0.0, help="SPRT H0: engine 1 is this much stronger")
+    parser.add_argument("--elo1", type=float, default=10.0, help="SPRT H1: engine 1 is this much stronger")
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    args = parser.parse_args()
+
+    base, _, inc = args.tc.partition("+")
+    args.base, args.inc = float(base), float(inc or 0)
+    args.options1 = parse_options(args.option1)
+    args.options2 = parse_options(args.option2)
+    args.openings = load_openings(args.openings) if args.openings else BALANCED_OPENINGS
+
+    control = f"{args.movetime} ms/move" if args.movetime else f"{args.tc}s"
+    print(f"--- Match: engine 1 {args.options1 or ''} vs engine 2 {args.options2 or ''} | {control} | "
+          f"{args.concurrency} games at a time | SPRT elo0={args.elo0} elo1={args.elo1} ---")
+
+    match = Match(args)
+    start = time.perf_counter()
+    match.run()
+    elapsed = time.perf_counter() - start
+
+    elo, error = elo_estimate(match.wins, match.draws, match.losses) if match.next_game else (0.0, 0.0)
+    print(f"\nFinished {match.wins + match.draws + match.losses} games in {elapsed:.0f}s")
+    print(f"Score of engine 1: +{match.wins} ={match.draws} -{match.losses} | Elo {elo:+.1f} +/- {error:.1f}")
+    print(f"SPRT: {match.verdict or 'no decision yet (raise --games)'}")
+    print(f"Engine 1: {match.stats[0].summary()}")
+    print(f"Engine 2: {match.stats[1].summary()}")
+
+if __name__ == "__main__":
+    main()
@@ -27,7 +27,8 @@ class ChessNet(nn.Module):
         x = F.relu(self.conv2(x))
         
         # Flatten the 3D tensor into a 1D line of numbers for the Fully Connected layers
-        x = x.view(-1, 8192)
+        # (flatten instead of view, so it also works when the tensor is stored channels_last)
+        x = torch.flatten(x, 1)
         
         x = F.relu(self.fc1(x))
         x = self.fc2(x) 
@@ -0,0 +1,27 @@
+from evaluate import evaluate_board
+
+# Every worker process of a multiprocessing.Pool (selfplay.py, epd_runner.py) picks its
+# evaluation function once, when it starts.
+# (We can't send a function that lives inside integration.py through the pool cheaply,
+# and importing integration loads PyTorch and the network, so we only do it when asked.)
+_eval_func = evaluate_board
+
+def init_worker(use_ai):
+    """
+    Pass this as the Pool's initializer: mp.Pool(workers, initializer=init_worker, initargs=(use_ai,))
+    """
+    global _eval_func
+    if use_ai:
+        import torch
+        # One PyTorch thread per worker: the parallelism comes from the processes themselves.
+        # Letting every worker grab every core would make them fight each other.
+        torch.set_num_threads(1)
+        from integration import ai_evaluate_board, load_ai_brain
+        load_ai_brain()
+        _eval_func = ai_evaluate_board
+
+def worker_eval_func():
+    """
+    The evaluation function this worker process should search with.
+    """
+    return _eval_func
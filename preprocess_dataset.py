@@ -0,0 +1,164 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+from data_processing import INDEX_DTYPE
+
+# chessData.csv has ~16M rows, but many of them are the SAME position: the same opening reached
+# from different games, or a transposition with different move counters. This script boils the
+# file down to one entry per unique position (averaging the evaluations of the duplicates), puts
+# every position into the train or validation split, and writes two small index files
+# that ChessDataset.from_index() can train on. The big CSV itself is never rewritten.
+#
+# Memory stays bounded no matter how big the CSV is:
+#   Pass 1 streams the CSV line by line and spreads the rows over NUM_BUCKETS temporary files by hash.
+#   Pass 2 dedups ONE bucket at a time (every copy of a position lands in the same bucket).
+
+NUM_BUCKETS = 256
+CHUNK_ROWS = 1_000_000 # Rows we collect in RAM before writing them out to the buckets
+
+# One row in a bucket file: the position hash, where the row is in the CSV, and its evaluation
+BUCKET_DTYPE = np.dtype([
+    ('hash', '<u8'),
+    ('offset', '<u8'),
+    ('eval', '<f4'),
+])
+
+def position_hash(fen):
+    """
+    A 64-bit hash of the position itself. Only the first 4 FEN fields count (pieces, side to move,
+    castling rights, en passant square): the halfmove and fullmove counters don't change the position,
+    so transpositions reached at different move numbers get the same hash.
+    """
+    position = b' '.join(fen.split(b' ')[:4])
+    return int.from_bytes(hashlib.blake2b(position, digest_size=8).digest(), 'little')
+
+def is_validation(hashes, val_fraction):
+    """
+    The split only depends on the hash, so it is the same on every run and every machine,
+    and all duplicates of a position end up on the same side (no train positions leak into val).
+    We use the top 32 bits, the bucket uses the bottom ones.
+    """
+    return (hashes >> np.uint64(32)).astype(np.float64) / 2**32 < val_fraction
+
+def split_into_buckets(csv_path, bucket_dir, num_buckets):
+    """
+    Pass 1: stream the CSV and append (hash, offset, eval) for every usable row to its bucket file.
+    """
+    bucket_files = [open(os.path.join(bucket_dir, f"bucket_{i:04d}.bin"), 'wb') for i in range(num_buckets)]
+    chunk = np.empty(CHUNK_ROWS, dtype=BUCKET_DTYPE)
+    filled = 0
+    rows = 0
+    skipped = 0
+
+    def flush(chunk):
+        # Sort the chunk by bucket so each bucket gets one contiguous write
+        buckets = chunk['hash'] % np.uint64(num_buckets)
+        order = np.argsort(buckets, kind='stable')
+        chunk, buckets = chunk[order], buckets[order]
+        bounds = np.searchsorted(buckets, np.arange(num_buckets + 1))
+        for i in range(num_buckets):
+            if bounds[i] < bounds[i + 1]:
+                chunk[bounds[i]:bounds[i + 1]].tofile(bucket_files[i])
+
+    # Binary mode, so we know the exact byte offset of every row
+    with open(csv_path, 'rb') as f:
+        offset = 0
+        for line in f:
+            row_offset = offset
+            offset += len(line)
+            fen, _, evaluation = line.rstrip(b'\r\n').partition(b',')
+            # Same cleaning as load_kaggle_dataset: mate scores like '#+4' are left out (and so is the header)
+            try:
+                value = float(evaluation)
+            except ValueError:
+                skipped += 1
+                continue
+
+            chunk[filled] = (position_hash(fen), row_offset, value)
+            filled += 1
+            rows += 1
+            if filled == CHUNK_ROWS:
+                flush(chunk)
+                filled = 0
+                print(f"  {rows} rows hashed...")
+        if filled:
+            flush(chunk[:filled])
+
+    for bucket_file in bucket_files:
+        bucket_file.close()
+    return rows, skipped
+
+def dedup_bucket(path):
+    """
+    Pass 2: ONE entry per unique hash in this bucket, with the average evaluation of all its copies.
+    The FEN we keep is the first copy's (they only differ in the move counters).
+    """
+    rows = np.fromfile(path, dtype=BUCKET_DTYPE)
+    hashes, first, inverse, counts = np.unique(rows['hash'], return_index=True, return_inverse=True, return_counts=True)
+    evals = np.bincount(inverse, weights=rows['eval'], minlength=len(hashes)) / counts
+
+    entries = np.empty(len(hashes), dtype=INDEX_DTYPE)
+    entries['offset'] = rows['offset'][first]
+    entries['eval'] = evals
+    return hashes, entries
+
+def main():
+    parser = argparse.ArgumentParser(description="Dedup chessData.csv and write train/validation index files.")
+    parser.add_argument("--data", default="chessData.csv", help="Path to the Kaggle CSV")
+    parser.add_argument("--out", default="dataset_index", help="Directory for train.idx, val.idx and meta.json")
+    parser.add_argument("--val-fraction", type=float, default=0.02, help="Share of the positions held out for validation")
+    parser.add_argument("--buckets", type=int, default=NUM_BUCKETS,
+                        help="More buckets = less RAM in pass 2 (each holds about rows/buckets entries)")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    bucket_dir = os.path.join(args.out, "buckets")
+    os.makedirs(bucket_dir, exist_ok=True)
+    print("--- Preprocessing the Dataset ---")
+    start = time.perf_counter()
+
+    # 1. Hash every row and spread the rows over the bucket files
+    rows, skipped = split_into_buckets(args.data, bucket_dir, args.buckets)
+    print(f"Pass 1: {rows} rows hashed, {skipped} lines skipped (header / mate scores)")
+
+    # 2. Dedup the buckets one by one and send every unique position to train or val
+    counts = {"train": 0, "val": 0}
+    with open(os.path.join(args.out, "train.idx"), 'wb') as train_file, \
+         open(os.path.join(args.out, "val.idx"), 'wb') as val_file:
+        for i in range(args.buckets):
+            path = os.path.join(bucket_dir, f"bucket_{i:04d}.bin")
+            hashes, entries = dedup_bucket(path)
+            os.remove(path)
+
+            val = is_validation(hashes, args.val_fraction)
+            entries[~val].tofile(train_file)
+            entries[val].tofile(val_file)
+            counts["train"] += int((~val).sum())
+            counts["val"] += int(val.sum())
+    shutil.rmtree(bucket_dir)
+
+    unique = counts["train"] + counts["val"]
+    print(f"Pass 2: {unique} unique positions ({rows - unique} duplicates merged)")
+    print(f"Train: {counts['train']} | Validation: {counts['val']}")
+
+    # 3. Remember which CSV the offsets point into, so training can find the FENs again
+    with open(os.path.join(args.out, "meta.json"), 'w') as f:
+        json.dump({
+            "csv": os.path.abspath(args.data),
+            "csv_bytes": os.path.getsize(args.data),
+            "rows": rows,
+            "skipped": skipped,
+            "unique": unique,
+            "train": counts["train"],
+            "val": counts["val"],
+            "val_fraction": args.val_fraction,
+        }, f, indent=2)
+    print(f"Done in {time.perf_counter() - start:.0f}s, index written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import multiprocessing as mp
+import random
+import sys
+import time
+
+import chess
+import numpy as np
+from alphabeta import search_root
+from data_processing import RECORD_DTYPE, board_to_packed
+from pool_worker import init_worker, worker_eval_func
+
+def game_result(board):
+    """
+    Returns +1 if White won, -1 if Black won, and 0 for a draw (or an unfinished game).
+    """
+    outcome = board.outcome(claim_draw=True)
+    if outcome is None or outcome.winner is None:
+        return 0
+    return 1 if outcome.winner == chess.WHITE else -1
+
+def play_game(task):
+    """
+    Plays ONE self-play game and returns all of its positions as a RECORD_DTYPE array.
+    task = (seed, depth, random_plies, max_plies)
+    """
+    seed, depth, random_plies, max_plies = task
+    rng = random.Random(seed)
+    board = chess.Board()
+
+    # 1. Randomized opening: a few random moves so that every game is different
+    for _ in range(random_plies):
+        moves = list(board.legal_moves)
+        if not moves:
+            break
+        board.push(rng.choice(moves))
+
+    # 2. Let the engine play against itself and remember what it thought of every position
+    planes, turns, scores = [], [], []
+    while not board.is_game_over(claim_draw=True) and board.ply() < max_plies:
+        best_move, best_eval = search_root(board, depth, eval_func=worker_eval_func())
+        planes.append(board_to_packed(board))
+        turns.append(1 if board.turn == chess.WHITE else 0)
+        scores.append(best_eval)
+        board.push(best_move)
+
+    # 3. Now that we know how the game ended, label every position with the result
+    records = np.zeros(len(planes), dtype=RECORD_DTYPE)
+    if len(planes) > 0:
+        records['planes'] = np.stack(planes)
+        records['turn'] = turns
+        # Mate scores (99999) don't fit in int16, so we clip them
+        records['score'] = np.clip(np.array(scores), -32767, 32767).astype(np.int16)
+        records['result'] = game_result(board)
+    return records
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate training data by letting the engine play itself.")
+    parser.add_argument("--games", type=int, default=100, help="Number of self-play games")
+    parser.add_argument("--workers", type=int, default=mp.cpu_count(), help="Number of worker processes")
+    parser.add_argument("--depth", type=int, default=2, help="Alpha-beta search depth per move")
+    parser.add_argument("--random-plies", type=int, default=8, help="Random opening moves per game")
+    parser.add_argument("--max-plies", type=int, default=200, help="Games longer than this are scored as draws")
+    parser.add_argument("--seed", type=int, default=0, help="Base random seed (game i uses seed + i)")
+    parser.add_argument("--ai", action="store_true", help="Search with the neural network instead of material")
+    parser.add_argument("--out", default="selfplay.bin", help="Binary file to append records to")
+    args = parser.parse_args()
+
+    print(f"--- Self-Play: {args.games} games on {args.workers} workers (depth {args.depth}) ---")
+    tasks = [(args.seed + i, args.depth, args.random_plies, args.max_plies) for i in range(args.games)]
+
+    total_positions = 0
+    start = time.perf_counter()
+
+    with mp.Pool(args.workers, initializer=init_worker, initargs=(args.ai,)) as pool, open(args.out, "ab") as out:
+        # imap_unordered hands us each game as soon as ANY worker finishes it,
+        # so we stream records to disk instead of waiting for the slowest game.
+        for games_done, records in enumerate(pool.imap_unordered(play_game, tasks), start=1):
+            out.write(records.tobytes())
+            out.flush()
+
+            total_positions += len(records)
+            elapsed = time.perf_counter() - start
+            print(f"Game {games_done}/{args.games} | {len(records)} positions | "
+                  f"{total_positions / elapsed:.1f} positions/sec", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {total_positions} positions to {args.out} in {elapsed:.1f}s "
+          f"({total_positions / elapsed:.1f} positions/sec)")
+
+if __name__ == "__main__":
+    main()
@@ -1,96 +1,315 @@
+import argparse
+import os
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import DataLoader
+import torch.distributed as dist
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import ConcatDataset, DataLoader
+from torch.utils.data.distributed import DistributedSampler
 from network import ChessNet
-from dataset_loader import ChessDataset
-import wandb # The logging library you requested!
+from dataset_loader import ChessDataset, SelfPlayDataset
 
-def main():
-    print("--- Starting Production Chess Training ---")
-    
-    # 1. Initialize Weights & Biases for Remote Logging
-    # (You will need to run 'wandb login' in your GCP terminal first)
-    wandb.init(project="chess-antigravity", name="stockfish-evals-run1")
-    
-    # 2. Check for the NVIDIA L4 GPU!
-    # If the VM has CUDA installed properly, PyTorch will see it immediately.
-    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-    print(f"Using compute device: {device}")
-    
-    # 3. Load the model and move it to the GPU
-    model = ChessNet().to(device)
-    
-    print("Loading the dataset (this might take a minute for 16M rows)...")
+# The logging library you requested!
+# It's optional: on offline training nodes without wandb we simply print the numbers instead.
+try:
+    import wandb
+except ImportError:
+    wandb = None
+
+def load_kaggle_dataset(csv_path):
     import pandas as pd
-    
+
     # Load the actual Kaggle CSV downloaded on the VM
     # The Kaggle file is called 'chessData.csv' and has 'FEN' and 'Evaluation' columns
-    df = pd.read_csv("chessData.csv")
-    
+    df = pd.read_csv(csv_path)
+
     # Clean the data: Some evaluations in the dataset are strings like '#+4' (mate in 4).
     # We filter those out to keep pure numerical centipawn scores mapping to standard evaluations.
     df = df[~df['Evaluation'].astype(str).str.contains('#')]
     df['Evaluation'] = df['Evaluation'].astype(float)
-    
+
     real_fens = df['FEN'].tolist()
     real_evals = df['Evaluation'].tolist()
-    
-    dataset = ChessDataset(real_fens, real_evals)
-    
+
+    return ChessDataset(real_fens, real_evals)
+
+def load_index_datasets(index_dir, csv_path=None):
+    """
+    Loads the deduplicated train/validation split written by preprocess_dataset.py.
+    """
+    train_dataset = ChessDataset.from_index(os.path.join(index_dir, "train.idx"), csv_path)
+    val_dataset = ChessDataset.from_index(os.path.join(index_dir, "val.idx"), csv_path)
+    return train_dataset, val_dataset
+
+def unwrap(model):
+    """
+    Returns the plain ChessNet inside a DistributedDataParallel and/or torch.compile wrapper.
+    """
+    if isinstance(model, DistributedDataParallel):
+        model = model.module
+    # torch.compile keeps the original module in _orig_mod (its state_dict keys get a prefix otherwise)
+    return getattr(model, "_orig_mod", model)
+
+def prepare_model(model, device, channels_last=False, compile_model=False):
+    """
+    Moves the model to the device and applies the optional speed-ups:
+    - channels_last: stores each board as (H, W, C) in memory, which the CPU/GPU conv kernels prefer
+    - compile_model: torch.compile fuses the layers into fewer, faster kernels (the first batches are slow!)
+    """
+    model = model.to(device)
+    if channels_last:
+        model = model.to(memory_format=torch.channels_last)
+    if compile_model:
+        model = torch.compile(model)
+    return model
+
+def autocast(device, enabled):
+    """
+    Mixed precision: bfloat16 on the CPU (same range as fp32, so no loss scaling needed)
+    and float16 on an NVIDIA GPU (together with a GradScaler).
+    """
+    dtype = torch.float16 if device.type == 'cuda' else torch.bfloat16
+    return torch.autocast(device_type=device.type, dtype=dtype, enabled=enabled)
+
+def validate(model, dataloader, criterion, device, memory_format, amp, distributed):
+    """
+    The average loss over the validation set (summed over every process when distributed).
+    """
+    model.eval()
+    total_loss = torch.zeros((), device=device)
+    total_samples = 0
+    with torch.no_grad():
+        for batch_boards, batch_evals in dataloader:
+            batch_boards = batch_boards.to(device, memory_format=memory_format, non_blocking=True)
+            batch_evals = batch_evals.to(device, non_blocking=True)
+            with autocast(device, amp):
+                predictions = model(batch_boards)
+            total_loss += criterion(predictions.float(), batch_evals) * batch_boards.size(0)
+            total_samples += batch_boards.size(0)
+
+    if distributed:
+        totals = torch.stack([total_loss.double(), torch.tensor(total_samples, dtype=torch.float64)])
+        dist.all_reduce(totals, op=dist.ReduceOp.SUM)
+        total_loss, total_samples = totals[0], totals[1].item()
+    return total_loss.item() / max(total_samples, 1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Train ChessNet on the Kaggle Stockfish evaluations.")
+    parser.add_argument("--data", default=None,
+                        help="Path to the Kaggle CSV (default: chessData.csv, or the CSV recorded in --index-dir)")
+    parser.add_argument("--index-dir", default=None,
+                        help="Train on the deduplicated split from preprocess_dataset.py (with validation)")
+    parser.add_argument("--patience", type=int, default=5,
+                        help="Stop after this many epochs without a better validation loss (0 = never stop early)")
+    parser.add_argument("--selfplay", default=None, help="Also train on the records written by selfplay.py")
+    parser.add_argument("--selfplay-only", action="store_true", help="Train on --selfplay alone, without the CSV")
+    parser.add_argument("--result-weight", type=float, default=0.0,
+                        help="Self-play target: 0 = search score only, 1 = game result only")
+    parser.add_argument("--epochs", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=4096, help="Batch size PER PROCESS")
+    parser.add_argument("--lr", type=float, default=0.001)
+    parser.add_argument("--num-workers", type=int, default=4, help="DataLoader workers per process")
+    parser.add_argument("--no-wandb", action="store_true", help="Only print the loss, never contact wandb")
+    # High-throughput mode (see bench_train.py to measure which of these help on your machine)
+    parser.add_argument("--amp", action="store_true", help="Mixed precision: bf16 on CPU, fp16 on GPU")
+    parser.add_argument("--channels-last", action="store_true", help="Use the channels_last memory format")
+    parser.add_argument("--compile", action="store_true", help="torch.compile the ChessNet")
+    parser.add_argument("--log-interval", type=int, default=0,
+                        help="Print the running loss every N batches (0 = only at the end of each epoch)")
+    args = parser.parse_args()
+    if args.selfplay_only and args.selfplay is None:
+        parser.error("--selfplay-only needs --selfplay PATH")
+
+    # 1. Are we one of several processes? torchrun sets WORLD_SIZE/RANK for every process it launches:
+    #    torchrun --nproc_per_node=8 train_gcp.py
+    #    torchrun --nnodes=2 --node_rank=0 --nproc_per_node=8 --master_addr=10.0.0.1 --master_port=29500 train_gcp.py
+    # We use the 'gloo' backend because it runs on plain CPUs (no NVIDIA card needed).
+    world_size = int(os.environ.get("WORLD_SIZE", "1"))
+    distributed = world_size > 1
+    if distributed:
+        dist.init_process_group(backend="gloo")
+    rank = dist.get_rank() if distributed else 0
+    is_main = rank == 0 # Only process 0 prints, logs and saves checkpoints
+
+    if is_main:
+        print("--- Starting Production Chess Training ---")
+        if distributed:
+            print(f"Data-parallel training over {world_size} processes (gloo)")
+
+    # 2. Initialize Weights & Biases for Remote Logging
+    # (You will need to run 'wandb login' in your GCP terminal first)
+    use_wandb = is_main and wandb is not None and not args.no_wandb
+    if use_wandb:
+        # Track hyperparams in wandb
+        try:
+            wandb.init(project="chess-antigravity", name="stockfish-evals-run1", config={
+              "learning_rate": args.lr,
+              "epochs": args.epochs,
+              "batch_size": args.batch_size,
+              "world_size": world_size
+            })
+        except Exception as e:
+            # No 'wandb login' or no network (an offline node): keep training, just log to the terminal.
+            # (Crashing here would also leave the other torchrun processes hanging forever.)
+            print(f"Could not start wandb ({e}), logging to the terminal only.")
+            use_wandb = False
+    elif is_main:
+        print("wandb disabled, logging to the terminal only.")
+
+    # 3. Check for the NVIDIA L4 GPU!
+    # If the VM has CUDA installed properly, PyTorch will see it immediately.
+    # gloo only moves CPU tensors around, so data-parallel runs always stay on the CPU.
+    device = torch.device('cuda' if torch.cuda.is_available() and not distributed else 'cpu')
+    if is_main:
+        print(f"Using compute device: {device}")
+
+    # 4. Load the model and move it to the GPU
+    model = prepare_model(ChessNet(), device, args.channels_last, args.compile)
+    if distributed:
+        # DDP averages the gradients of all processes after every backward(),
+        # so every copy of the model stays identical.
+        model = DistributedDataParallel(model)
+
+    if args.selfplay_only:
+        dataset, val_dataset = None, None
+    elif args.index_dir:
+        # Only the small index files are read here: the FENs come out of the CSV batch by batch
+        # The index remembers where the CSV was; --data overrides that if the CSV has moved since
+        dataset, val_dataset = load_index_datasets(args.index_dir, args.data)
+        if is_main:
+            print(f"Loaded the index: {len(dataset)} training and {len(val_dataset)} validation positions")
+    else:
+        if is_main:
+            print("Loading the dataset (this might take a minute for 16M rows)...")
+        dataset = load_kaggle_dataset(args.data or "chessData.csv")
+        val_dataset = None
+
+    # Self-play records are fixed-size binary rows, so they sit next to the CSV positions in one dataset
+    # (DistributedSampler and shuffling then work on the combined data exactly as before)
+    if args.selfplay:
+        selfplay_dataset = SelfPlayDataset(args.selfplay, result_weight=args.result_weight)
+        if is_main:
+            print(f"Loaded {len(selfplay_dataset)} self-play positions from {args.selfplay}")
+        dataset = selfplay_dataset if dataset is None else ConcatDataset([dataset, selfplay_dataset])
+
+    # Each process only trains on its own 1/world_size slice of the data.
+    sampler = DistributedSampler(dataset, shuffle=True) if distributed else None
+
     # The DataLoader automatically bundles the data into batches of say, 4096 boards
     # and handles tossing them to the GPU asynchronously while the CPU prepares the next batch.
-    dataloader = DataLoader(dataset, batch_size=4096, shuffle=True, num_workers=4)
-    
+    dataloader = DataLoader(dataset, batch_size=args.batch_size, shuffle=(sampler is None),
+                            sampler=sampler, num_workers=args.num_workers)
+    val_dataloader = None
+    if val_dataset is not None:
+        val_sampler = DistributedSampler(val_dataset, shuffle=False) if distributed else None
+        val_dataloader = DataLoader(val_dataset, batch_size=args.batch_size, shuffle=False,
+                                    sampler=val_sampler, num_workers=args.num_workers)
+
     # 5. Training Fundamentals
     criterion = nn.MSELoss()
-    optimizer = optim.Adam(model.parameters(), lr=0.001)
-    
-    # Track hyperparams in wandb
-    wandb.config = {
-      "learning_rate": 0.001,
-      "epochs": 100,
-      "batch_size": 4096
-    }
-    
-    print("Starting Training Loop!")
-    for epoch in range(1, 101):
+    optimizer = optim.Adam(model.parameters(), lr=args.lr)
+    # fp16 gradients can underflow to zero, so on the GPU we scale the loss up first (a no-op otherwise)
+    scaler = torch.amp.GradScaler('cuda', enabled=args.amp and device.type == 'cuda')
+    memory_format = torch.channels_last if args.channels_last else torch.contiguous_format
+    best_val_loss = float("inf")
+    epochs_without_improvement = 0
+
+    if is_main:
+        print("Starting Training Loop!")
+    for epoch in range(1, args.epochs + 1):
         model.train() # Set to training mode
-        epoch_loss = 0.0
-        
+        if sampler is not None:
+            sampler.set_epoch(epoch) # Reshuffle the slices differently every epoch
+        # The loss is summed up ON THE DEVICE. Calling loss.item() every batch would make
+        # the CPU stop and wait for the GPU each step, so we only read it back when we log.
+        epoch_loss = torch.zeros((), device=device)
+        epoch_samples = 0
+
         # Loop over every single batch in the 16 million FENs
-        for batch_boards, batch_evals in dataloader:
-            
+        for step, (batch_boards, batch_evals) in enumerate(dataloader, start=1):
+
             # MOVE the data from CPU Ram specifically onto the GPU VRAM!
-            batch_boards = batch_boards.to(device)
-            batch_evals = batch_evals.to(device)
-            
-            optimizer.zero_grad()
-            predictions = model(batch_boards)
-            loss = criterion(predictions, batch_evals)
-            
-            loss.backward()
-            optimizer.step()
-            
-            epoch_loss += loss.item() * batch_boards.size(0)
-            
-        # Calculate the average mistake amount over the whole epoch
-        avg_loss = epoch_loss / len(dataset)
-        print(f"Epoch {epoch}/100 | Avg Training Loss: {avg_loss:.4f}")
-        
-        # LOG TO WANDB! 
-        # This streams the Loss securely to your web dashboard instantly.
-        wandb.log({"epoch": epoch, "loss": avg_loss})
-        
+            batch_boards = batch_boards.to(device, memory_format=memory_format, non_blocking=True)
+            batch_evals = batch_evals.to(device, non_blocking=True)
+
+            optimizer.zero_grad(set_to_none=True)
+            with autocast(device, args.amp):
+                predictions = model(batch_boards)
+                # Compute the loss in fp32 so small mistakes don't round away
+                loss = criterion(predictions.float(), batch_evals)
+
+            scaler.scale(loss).backward()
+            scaler.step(optimizer)
+            scaler.update()
+
+            epoch_loss += loss.detach() * batch_boards.size(0)
+            epoch_samples += batch_boards.size(0)
+
+            if is_main and args.log_interval and step % args.log_interval == 0:
+                print(f"  Batch {step} | Running Loss: {(epoch_loss / epoch_samples).item():.4f}")
+
+        # Add up the loss of every process so the number we log covers the whole dataset
+        if distributed:
+            totals = torch.stack([epoch_loss.double(), torch.tensor(epoch_samples, dtype=torch.float64)])
+            dist.all_reduce(totals, op=dist.ReduceOp.SUM)
+            epoch_loss, epoch_samples = totals[0], totals[1].item()
+
+        # Calculate the average mistake amount over the whole epoch (the one sync per epoch)
+        avg_loss = epoch_loss.item() / epoch_samples
+
+        # Check the positions we never train on: if their loss stops going down, we are only memorizing.
+        # (Every process gets the same all-reduced number, so they all stop at the same epoch.)
+        val_loss = None
+        improved = False
+        if val_dataloader is not None:
+            val_loss = validate(model, val_dataloader, criterion, device, memory_format, args.amp, distributed)
+            improved = val_loss < best_val_loss
+            if improved:
+                best_val_loss = val_loss
+                epochs_without_improvement = 0
+            else:
+                epochs_without_improvement += 1
+        stop_early = args.patience and epochs_without_improvement >= args.patience
+
+        if is_main:
+            message = f"Epoch {epoch}/{args.epochs} | Avg Training Loss: {avg_loss:.4f}"
+            if val_loss is not None:
+                message += f" | Validation Loss: {val_loss:.4f}"
+            print(message)
+
+            # LOG TO WANDB!
+            # This streams the Loss securely to your web dashboard instantly.
+            if use_wandb:
+                wandb.log({"epoch": epoch, "loss": avg_loss, **({"val_loss": val_loss} if val_loss is not None else {})})
+
+            # With a validation set, best_model.pth is the epoch with the LOWEST validation loss
+            if improved:
+                torch.save(unwrap(model).state_dict(), "best_model.pth")
+                print("New best validation loss, saved best_model.pth")
+
+        if stop_early:
+            if is_main:
+                print(f"No improvement for {args.patience} epochs, stopping early.")
+            break
+        if not is_main:
+            continue
+
         # Save checkpoints safely every 5 epochs
+        # (we always save the plain ChessNet weights, never the DDP wrapper, so integration.py can load them)
         if epoch % 5 == 0:
-            torch.save(model.state_dict(), f"antigravity_chess_epoch_{epoch}.pth")
+            torch.save(unwrap(model).state_dict(), f"antigravity_chess_epoch_{epoch}.pth")
             print(f"Model Checkpoint Saved for Epoch {epoch}!")
 
-    print("Training Finished!")
-    # Save the absolute final Golden Model weights
-    torch.save(model.state_dict(), "best_model.pth")
-    wandb.finish()
+    if is_main:
+        print("Training Finished!")
+        if val_dataloader is None:
+            # Without a validation set, the absolute final weights are our Golden Model
+            torch.save(unwrap(model).state_dict(), "best_model.pth")
+    if use_wandb:
+        wandb.finish()
+    if distributed:
+        dist.destroy_process_group()
 
 if __name__ == "__main__":
     main()
@@ -1,7 +1,117 @@
 #!/Library/Frameworks/Python.framework/Versions/3.11/bin/python3.11
 import sys
+import threading
 import chess
-from integration import get_best_move_with_ai
+from alphabeta import iterative_deepening, SearchState, MAX_DEPTH, entries_for_hash, DEFAULT_HASH_MB
+from evaluate import evaluate_board
+
+# Importing PyTorch and loading best_model.pth takes seconds, and some GUIs give up
+# if 'uci' isn't answered quickly. So we DON'T import integration here: a background
+# thread loads the network while the main loop is already answering the GUI.
+brain_ready = threading.Event()
+ai_evaluate = None # Becomes integration.ai_evaluate_board once the network is loaded
+
+# How long a 'go' that arrives before the network is ready waits for it,
+# before falling back to the classical material evaluation.
+BRAIN_WAIT_SECONDS = 5.0
+
+# Search limits for 'go'
+DEFAULT_DEPTH = 3 # A plain "go" (no depth, no clock): strong, computationally reasonable search
+MOVES_TO_GO_GUESS = 30 # With "go wtime ..." we plan as if the game lasts this many more moves
+MOVE_OVERHEAD_MS = 50 # Kept in reserve for Python and the GUI, so we never lose on time
+
+def load_brain():
+    global ai_evaluate
+    try:
+        import integration
+        integration.load_ai_brain()
+        ai_evaluate = integration.ai_evaluate_board
+    except Exception as e:
+        print(f"WARNING: could not load the neural network ({e}). Using material evaluation.", file=sys.stderr)
+    finally:
+        brain_ready.set()
+
+def start_loading_brain():
+    # daemon=True: a 'quit' during loading shouldn't have to wait for PyTorch
+    threading.Thread(target=load_brain, daemon=True).start()
+
+def pick_eval_func(use_network=True, max_wait=BRAIN_WAIT_SECONDS):
+    """
+    The neural network if it is loaded (waiting a little if it's still loading), otherwise material.
+    """
+    if not use_network:
+        return evaluate_board
+    brain_ready.wait(timeout=max_wait)
+    if ai_evaluate is None:
+        print("info string neural network not ready, searching with material evaluation")
+        return evaluate_board
+    return ai_evaluate
+
+def parse_position(parts):
+    """
+    Splits a 'position' command into the FEN we start from and the list of moves played since.
+    e.g. "position startpos moves e2e4 e7e5" -> (STARTING_FEN, ['e2e4', 'e7e5'])
+    """
+    if "startpos" in parts:
+        start_fen = chess.STARTING_FEN
+    else:
+        fen_index = parts.index("fen")
+        # The FEN string is usually everything after 'fen' until 'moves'
+        # But for simplicity, let's assume standard FEN here
+        start_fen = " ".join(parts[fen_index+1:fen_index+7])
+    
+    moves = []
+    if "moves" in parts:
+        moves = parts[parts.index("moves") + 1:]
+    return start_fen, moves
+
+def parse_go(parts, turn):
+    """
+    Reads the search limits out of a 'go' command, e.g. "go wtime 60000 btime 60000 winc 500 binc 500".
+    Returns (max depth, time limit in seconds or None, node limit or None).
+    """
+    def value(name):
+        if name in parts:
+            try:
+                return int(parts[parts.index(name) + 1])
+            except (IndexError, ValueError):
+                pass
+        return None
+    
+    depth = value("depth")
+    node_limit = value("nodes")
+    movetime = value("movetime")
+    clock = value("wtime" if turn == chess.WHITE else "btime")
+    increment = value("winc" if turn == chess.WHITE else "binc") or 0
+    
+    time_limit = None
+    if movetime is not None:
+        time_limit = max(movetime - MOVE_OVERHEAD_MS, 1) / 1000
+    elif clock is not None:
+        # Spend an equal slice of the clock on every move that's left, plus most of the increment
+        budget_ms = clock / (value("movestogo") or MOVES_TO_GO_GUESS) + increment * 0.75
+        budget_ms = min(budget_ms, clock - MOVE_OVERHEAD_MS)
+        time_limit = max(budget_ms, 1) / 1000
+    
+    if depth is None:
+        depth = MAX_DEPTH if (time_limit is not None or node_limit is not None) else DEFAULT_DEPTH
+    return depth, time_limit, node_limit
+
+def send_info(board):
+    """
+    Returns an on_depth callback that tells the GUI how the search is going after every depth.
+    """
+    def on_depth(depth, lines, nodes, seconds):
+        if not lines:
+            return
+        move, score = lines[0]
+        # UCI scores are from the side to move's point of view, ours are from White's
+        score = score if board.turn == chess.WHITE else -score
+        nps = int(nodes / seconds) if seconds > 0 else 0
+        sys.stdout.write(f"info depth {depth} score cp {int(score)} nodes {nodes} nps {nps} "
+                         f"time {int(seconds * 1000)} pv {move.uci()}\n")
+        sys.stdout.flush()
+    return on_depth
 
 def main():
     """
@@ -10,14 +120,31 @@ def main():
     and writes responses to standard output (what we send back to the GUI).
     """
     board = chess.Board()
+    start_loading_brain()
+    
+    # What the GUI told us last time, so we can tell when it just added a move or two
+    start_fen = chess.STARTING_FEN
+    played_moves = []
+    
+    # Transposition table, history and eval cache survive from one move to the next
+    search_state = SearchState()
+    last_eval_func = None
+    
+    # Engine options the GUI (or match.py) can change with 'setoption'
+    use_network = True
     
     # We loop forever, listening for commands from the GUI
     while True:
         try:
-            line = sys.stdin.readline().strip()
+            line = sys.stdin.readline()
         except EOFError:
             break
-            
+        
+        # An empty read means the GUI closed our input: treat it like 'quit'
+        if not line:
+            break
+        
+        line = line.strip()
         if not line:
             continue
             
@@ -25,6 +152,8 @@ def main():
         if line == "uci":
             sys.stdout.write("id name Antigravity Chess AI\n")
             sys.stdout.write("id author Ido\n")
+            sys.stdout.write("option name Eval type combo default nn var nn var material\n")
+            sys.stdout.write(f"option name Hash type spin default {DEFAULT_HASH_MB} min 1 max 4096\n")
             sys.stdout.write("uciok\n") # This tells the GUI we are ready!
             sys.stdout.flush()
             
@@ -33,9 +162,25 @@ def main():
             sys.stdout.write("readyok\n")
             sys.stdout.flush()
             
+        # 'setoption' command: e.g. "setoption name Eval value material"
+        elif line.startswith("setoption"):
+            parts = line.split()
+            if "name" in parts and "value" in parts:
+                name = " ".join(parts[parts.index("name") + 1:parts.index("value")])
+                value = " ".join(parts[parts.index("value") + 1:])
+                if name.lower() == "eval":
+                    use_network = value.lower() != "material"
+                elif name.lower() == "hash" and value.isdigit():
+                    # Megabytes for the transposition table + eval cache, which start over empty
+                    search_state.max_entries = entries_for_hash(int(value))
+                    search_state.clear()
+            
         # 3. 'ucinewgame' command: The GUI is starting a new game
         elif line == "ucinewgame":
             board = chess.Board()
+            start_fen = chess.STARTING_FEN
+            played_moves = []
+            search_state.clear() # Nothing we learned applies to the new game
             
         # 4. 'position' command: The GUI is telling us what is on the board
         # e.g.: "position startpos moves e2e4 e7e5"
@@ -43,39 +188,41 @@ def main():
             # Split the command into parts
             parts = line.split()
             
-            # Reset the board whether it's 'startpos' or 'fen'
-            if "startpos" in parts:
-                board = chess.Board()
-            elif "fen" in parts:
-                try:
-                    fen_index = parts.index("fen")
-                    # The FEN string is usually everything after 'fen' until 'moves'
-                    # But for simplicity, let's assume standard FEN here
-                    fen_string = " ".join(parts[fen_index+1:fen_index+7])
-                    board = chess.Board(fen_string)
-                except Exception as e:
-                    # Ignore malformed FEN for now
-                    pass
+            try:
+                new_start_fen, new_moves = parse_position(parts)
+                if new_start_fen != start_fen or new_moves[:len(played_moves)] != played_moves:
+                    # A different game (or a take-back): rebuild the board from scratch
+                    board = chess.Board(new_start_fen)
+                    moves_to_push = new_moves
+                else:
+                    # Usual case: the same game plus our move and the opponent's reply.
+                    # Only push those instead of replaying the whole game again.
+                    moves_to_push = new_moves[len(played_moves):]
+            except Exception as e:
+                # Ignore malformed FEN for now
+                continue
             
-            # Now, apply all the moves that have been played in the game so far
-            if "moves" in parts:
-                moves_index = parts.index("moves")
-                for move_str in parts[moves_index + 1:]:
-                    board.push_uci(move_str)
+            # Now, apply the moves the board doesn't have yet
+            for move_str in moves_to_push:
+                board.push_uci(move_str)
+            start_fen, played_moves = new_start_fen, new_moves
                     
         # 5. 'go' command: The GUI wants us to think and make a move!
         # e.g.: "go wtime 300000 btime 300000" or "go depth 3"
         elif line.startswith("go"):
-            # Default to Depth 3 for a strong, computationally reasonable search
-            depth_to_search = 3
-            parts = line.split()
-            if "depth" in parts:
-                try:
-                    depth_to_search = int(parts[parts.index("depth") + 1])
-                except Exception:
-                    pass
+            depth_to_search, time_limit, node_limit = parse_go(line.split(), board.turn)
+            
+            # Don't let a slow network load eat the whole clock
+            max_wait = BRAIN_WAIT_SECONDS if time_limit is None else min(BRAIN_WAIT_SECONDS, time_limit / 2)
+            eval_func = pick_eval_func(use_network, max_wait)
+            if eval_func is not last_eval_func:
+                # Cached scores from the material evaluation mean nothing to the network (and vice versa)
+                search_state.clear()
+                last_eval_func = eval_func
             
-            best_move = get_best_move_with_ai(board, depth=depth_to_search)
+            lines, _ = iterative_deepening(board, depth_to_search, eval_func=eval_func, state=search_state,
+                                           time_limit=time_limit, node_limit=node_limit, on_depth=send_info(board))
+            best_move = lines[0][0] if lines else None
             
             # If the AI couldn't find a move (e.g. checkmate), just return a null move
             if best_move is None: